@@ -0,0 +1,206 @@
+"""Benchmark the `add`, `update <id>` and `update all` commands end to end.
+
+Each command is run by the real CLI in a subprocess, against the local fake
+Notion and InspireHEP server of the tests, with a database of N generated
+papers. The pages start with only their titles and eprints, so `update all`
+writes every one of them. Reports the wall time, the requests per endpoint, the
+bytes sent and received and the peak RSS of each command.
+
+The results are written as JSON with `--output`. Given the results of another
+release with `--baseline`, fails if a command got slower by more than
+`--tolerance` or sends more requests.
+
+Usage: poetry run python benchmarks/bench_e2e.py [--sizes 100 1000 10000]
+       [--latency 0] [--jobs 1] [--output results.json]
+       [--baseline baseline.json] [--tolerance 0.2]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "tests"))
+
+from fake_server import FakeServer, create_app_dir  # noqa: E402
+
+from hpm import __app_version__  # noqa: E402
+
+# Runs `hpm`, writing its peak RSS in bytes to the file given first. The peak RSS
+# is read by the command itself, as the one of its process would also count
+# the memory of this one it was spawned from.
+RUN_HPM = """
+import atexit
+import resource
+import sys
+
+
+@atexit.register
+def write_peak_rss():
+    try:
+        with open("/proc/self/status") as f:
+            status = f.read()
+        peak_rss = int(status.split("VmHWM:")[1].split()[0]) * 1024
+    except (OSError, IndexError):
+        # In KiB on Linux, but bytes on macOS
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_rss *= 1 if sys.platform == "darwin" else 1024
+
+    with open(peak_rss_file, "w") as f:
+        f.write(str(peak_rss))
+
+
+peak_rss_file = sys.argv.pop(1)
+from hpm.cli import app
+
+app(prog_name="hpm")
+"""
+
+
+def run(server: FakeServer, home: Path, args: list[str]) -> dict:
+    """Run `hpm` with the arguments, returning its measurements."""
+    env = os.environ | server.environ(home)
+
+    server.reset_stats()
+    with tempfile.NamedTemporaryFile() as peak_rss_file:
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-c", RUN_HPM, peak_rss_file.name, *args],
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+        wall_time = time.perf_counter() - start
+        peak_rss = int(Path(peak_rss_file.name).read_text() or 0)
+
+    if process.returncode != 0:
+        print(process.stdout, file=sys.stderr)
+
+    requests = dict(sorted(server.stats["requests"].items()))
+    return {
+        "exit_code": process.returncode,
+        "wall_time": wall_time,
+        "requests": requests,
+        "n_requests": sum(requests.values()),
+        "bytes_sent": server.stats["bytes_in"],
+        "bytes_received": server.stats["bytes_out"],
+        "peak_rss": peak_rss,
+    }
+
+
+def benchmark(n_papers: int, latency: float, rate_limit: float | None, jobs: int):
+    commands = {
+        "add": lambda eprints: ["add", eprints[-1]],
+        "update": lambda eprints: ["update", eprints[0]],
+        "update all": lambda eprints: ["update", "all", "--jobs", str(jobs)],
+        "update all --citations-only": lambda eprints: [
+            "update",
+            "all",
+            "--citations-only",
+            "--jobs",
+            str(jobs),
+        ],
+    }
+
+    results = []
+    with (
+        tempfile.TemporaryDirectory() as home,
+        FakeServer(latency=latency, rate_limit=rate_limit) as server,
+    ):
+        database_id, eprints = server.create_papers_database(n_papers)
+        create_app_dir(Path(home), database_id)
+
+        for command, args in commands.items():
+            result = run(server, Path(home), args(eprints))
+            results.append({"size": n_papers, "command": command} | result)
+            print_result(results[-1])
+
+    return results
+
+
+def print_result(result: dict) -> None:
+    print(
+        f"{result['size']:>6} {result['command']:<28}"
+        f"{result['wall_time']:>9.2f} s"
+        f"{result['n_requests']:>8} requests"
+        f"{result['bytes_sent'] / 2**20:>9.2f} MiB sent"
+        f"{result['bytes_received'] / 2**20:>9.2f} MiB received"
+        f"{result['peak_rss'] / 2**20:>8.1f} MiB RSS"
+        + ("" if result["exit_code"] == 0 else f"  (exit {result['exit_code']})")
+    )
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> list:
+    """Return the regressions of the results over the baseline."""
+    baseline = {(i["size"], i["command"]): i for i in baseline}
+
+    regressions = []
+    for result in results:
+        old = baseline.get((result["size"], result["command"]))
+        if old is None:
+            continue
+
+        name = f"{result['command']} ({result['size']} papers)"
+        if result["wall_time"] > old["wall_time"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: {old['wall_time']:.2f} s -> {result['wall_time']:.2f} s"
+            )
+        if result["n_requests"] > old["n_requests"]:
+            regressions.append(
+                f"{name}: {old['n_requests']} -> {result['n_requests']} requests"
+            )
+        if result["exit_code"] != 0:
+            regressions.append(f"{name}: exited with {result['exit_code']}")
+
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--latency", type=float, default=0, help="Seconds/request")
+    parser.add_argument("--rate-limit", type=float, help="Notion requests/second")
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="JSON file for the results")
+    parser.add_argument("--baseline", type=Path, help="JSON results to compare to")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = []
+    for n_papers in args.sizes:
+        results += benchmark(n_papers, args.latency, args.rate_limit, args.jobs)
+
+    if args.output:
+        data = {
+            "version": __app_version__,
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency": args.latency,
+            "rate_limit": args.rate_limit,
+            "jobs": args.jobs,
+            "results": results,
+        }
+        args.output.write_text(json.dumps(data, indent=2) + "\n")
+
+    failed = [i for i in results if i["exit_code"] != 0]
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+
+        return 1 if regressions or failed else 0
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
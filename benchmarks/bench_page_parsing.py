@@ -0,0 +1,85 @@
+"""Benchmark parsing pages from Notion responses.
+
+Compares `Page.from_response`, which builds the page properties without
+validation, with building them validated as user-constructed properties are.
+
+Usage: poetry run python benchmarks/bench_page_parsing.py [--pages 10000] [--repeat 3]
+"""
+
+import argparse
+import time
+from unittest.mock import patch
+
+from hpm.services.notion.objects.page import Page
+from hpm.services.notion.objects.page_properties import PageProperty
+
+
+def text(content: str) -> list[dict]:
+    return [{"type": "text", "text": {"content": content}}]
+
+
+def make_page(i: int) -> dict:
+    return {
+        "id": f"page-{i}",
+        "url": f"https://www.notion.so/page-{i}",
+        "properties": {
+            "Title": {"id": "title", "type": "title", "title": text(f"Paper {i}")},
+            "Authors": {
+                "id": "a",
+                "type": "multi_select",
+                "multi_select": [{"name": f"Author {j}"} for j in range(5)],
+            },
+            "Date": {"id": "d", "type": "date", "date": {"start": "2015-11-16"}},
+            "Published in": {"id": "p", "type": "select", "select": {"name": "JHEP"}},
+            "Published": {"id": "pd", "type": "date", "date": None},
+            "ArXiv ID": {"id": "e", "type": "rich_text", "rich_text": text(f"{i}")},
+            "Citations": {"id": "c", "type": "number", "number": i},
+            "DOI": {"id": "doi", "type": "rich_text", "rich_text": []},
+            "URL": {"id": "u", "type": "url", "url": f"https://inspirehep.net/{i}"},
+            "Abstract": {
+                "id": "ab",
+                "type": "rich_text",
+                "rich_text": text("x" * 1500),
+            },
+            "BibTeX": {"id": "b", "type": "rich_text", "rich_text": text("y" * 500)},
+        },
+    }
+
+
+def validated(cls, value, id=None):
+    return cls(value=value, id=id)
+
+
+def best_time(pages: list[dict], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for data in pages:
+            Page.from_response(data)
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = [make_page(i) for i in range(args.pages)]
+    n_properties = sum(len(i["properties"]) for i in pages)
+
+    trusted_time = best_time(pages, args.repeat)
+    with patch.object(PageProperty, "from_trusted", classmethod(validated)):
+        validated_time = best_time(pages, args.repeat)
+
+    print(f"{args.pages} pages, {n_properties} properties")
+    for name, seconds in [("validated", validated_time), ("trusted", trusted_time)]:
+        rate = n_properties / seconds
+        print(f"{name:>10}: {seconds:.3f} s ({rate:,.0f} properties/s)")
+    print(f"{'speedup':>10}: {validated_time / trusted_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Benchmark the startup time of the `hpm` command.
+
+Measures the cumulative import time of `hpm.cli` with `python -X importtime`,
+taking the median over several runs, and fails if it exceeds the budget.
+
+Usage: poetry run python benchmarks/bench_startup.py [--runs 10] [--budget 150]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+
+def import_times() -> tuple[int, dict[str, int]]:
+    """Return the cumulative import time in µs of `hpm.cli`, and of each module
+    it imports directly."""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import hpm.cli"],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    # Modules are listed after the ones they import, indented by their depth
+    lines = []
+    for line in output.stderr.splitlines()[1:]:
+        _, cumulative, module = line.split("|")
+        depth = (len(module) - len(module.lstrip()) - 1) // 2
+        lines.append((depth, module.strip(), int(cumulative)))
+
+    end = next(i for i, line in enumerate(lines) if line[1] == "hpm.cli")
+    start = end
+    while start > 0 and lines[start - 1][0] > 0:
+        start -= 1
+
+    imports = {i[1]: i[2] for i in lines[start:end] if i[0] == 1}
+    return lines[end][2], imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget", type=float, default=150, help="milliseconds")
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(args.runs)]
+    median = statistics.median(i[0] for i in runs) / 1000
+
+    # The slowest direct imports of the last run, to see what to make lazy
+    print("Slowest imports:")
+    imports = sorted(runs[-1][1].items(), key=lambda i: i[1], reverse=True)
+    for module, cumulative in imports[:10]:
+        print(f"  {module:<30} {cumulative / 1000:6.1f} ms")
+    print()
+
+    print(f"import hpm.cli: {median:.1f} ms (median of {args.runs})")
+    print(f"budget: {args.budget:.1f} ms")
+    if median > args.budget:
+        print("Over budget!")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark the overhead of runtime type checking on the Notion client.
+
+Times bulk `update_page` calls against a stub transport, with the type checks
+of `HPM_TYPECHECK` disabled and enabled. Each mode runs in a fresh process, as
+the checks are applied when the client is imported.
+
+Usage: poetry run python benchmarks/bench_typecheck.py [--calls 10000]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+def run(n_calls: int) -> float:
+    import hpm.services.notion.objects.page_properties as pg_props
+    from hpm.services.notion.client import Notion
+    from hpm.services.notion.rate_limiter import RateLimiter
+    from hpm.services.transport import Transport
+
+    class Response:
+        status_code = 200
+
+        def json(self):
+            return {}
+
+    class StubTransport(Transport):
+        def request(self, method, url, **kwargs):
+            return Response()
+
+    notion = Notion("token", StubTransport(), RateLimiter(rate=1e9, burst=n_calls))
+    properties = {
+        "Title": pg_props.Title("Paper"),
+        "Authors": pg_props.MultiSelect([f"Author {i}" for i in range(5)]),
+        "Citations": pg_props.Number(123),
+        "Abstract": pg_props.RichText("x" * 1500),
+        "BibTeX": pg_props.RichText("y" * 500),
+    }
+
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        notion.update_page("page", properties)
+
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=10000)
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run(args.calls)))
+        return
+
+    times = {}
+    for mode, value in [("unchecked", "0"), ("checked", "1")]:
+        env = os.environ | {"HPM_TYPECHECK": value}
+        command = [sys.executable, __file__, "--calls", str(args.calls), "--run"]
+        output = subprocess.run(command, env=env, capture_output=True, check=True)
+        times[mode] = json.loads(output.stdout)
+
+    print(f"{args.calls} update_page calls")
+    for mode, seconds in times.items():
+        per_call = seconds / args.calls * 1e6
+        print(f"{mode:>10}: {seconds:.3f} s ({per_call:.1f} µs/call)")
+    overhead = (times["checked"] - times["unchecked"]) / args.calls * 1e6
+    print(f"{'overhead':>10}: {overhead:.1f} µs/call")
+
+
+if __name__ == "__main__":
+    main()
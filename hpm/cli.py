@@ -1,20 +1,41 @@
-import pyfiglet
+from __future__ import annotations
+
+import copy
+import json
+from collections.abc import Iterable, Iterator
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING
+
 import typer
-from rich.prompt import Prompt
+from rich.markup import escape
 from typing_extensions import Annotated, Optional
 
-import hpm.services.notion.objects.database_properties as db_props
-from hpm.services.inspire_hep.client import InspireHEP
-from hpm.services.inspire_hep.objects import Paper
-from hpm.services.notion.client import Notion
-from hpm.services.notion.objects.database import Database
-from hpm.services.notion.objects.page import Page
-from hpm.services.notion.objects.page_properties import ALL_PAGE_PROPERTIES
-
 from . import __app_name__, __app_version__
 from .config import Config
+from .profiler import is_profiling, phase
 from .utils import console, print
 
+# The commands import the services they use when invoked, so that e.g.
+# `hpm --version` or `hpm info` does not pay for importing all of them
+if TYPE_CHECKING:
+    from hpm.services.inspire_hep.cache import InspireCache
+    from hpm.services.inspire_hep.client import InspireHEP
+    from hpm.services.inspire_hep.objects import Paper
+    from hpm.services.notion.client import Notion
+    from hpm.services.notion.objects.page import Page
+    from hpm.services.transport import Transport
+
+    from .mirror import Mirror
+    from .pipeline import Pipeline
+    from .schema import Schema
+    from .template import Template
+
+# Number of papers retrieved from InspireHEP in one search, and in one search
+# for citation counts or ids only, whose records are tiny
+INSPIRE_BATCH_SIZE = 50
+CITATIONS_BATCH_SIZE = 250
+
 app = typer.Typer(
     context_settings={"help_option_names": ["-h", "--help"]},
     add_completion=False,
@@ -37,6 +58,11 @@ def init(
         typer.Option("--force", "-f", help="Force reinitialize"),
     ] = False,
 ):
+    import pyfiglet
+    from rich.prompt import Prompt
+
+    from hpm.services.notion.client import Notion
+
     config = Config()
 
     # Print welcome message -------------------------------------------------- #
@@ -123,6 +149,10 @@ def demo(
     token: Annotated[str, typer.Option("--token", "-t", help="Notion API token")],
     page_id: Annotated[str, typer.Option("--page-id", "-p", help="Notion page ID")],
 ):
+    import hpm.services.notion.objects.database_properties as db_props
+    from hpm.services.notion.client import Notion
+    from hpm.services.notion.objects.database import Database
+
     # Clients
     notion = Notion(token)
 
@@ -154,19 +184,62 @@ def demo(
     print(f"[hint]Check it here: [url]{database.url}")
 
 
-@app.command(help="Add a paper via its ArXiv ID")
-def add(arxiv_id: str):
-    # Config
+@app.command(help="Add papers via their ArXiv IDs")
+def add(
+    ctx: typer.Context,
+    arxiv_id: Annotated[
+        Optional[str], typer.Argument(help="ArXiv ID of the paper")
+    ] = None,
+    file: Annotated[
+        Optional[typer.FileText],
+        typer.Option(
+            "--file", "-f", help="File of ArXiv IDs, one per line, or - for stdin"
+        ),
+    ] = None,
+    query: Annotated[
+        Optional[str],
+        typer.Option(
+            "--query", "-q", help="Add the papers found by an InspireHEP search"
+        ),
+    ] = None,
+    jobs: Annotated[
+        int,
+        typer.Option(
+            "--jobs", "-j", min=1, help="Number of pages to create concurrently"
+        ),
+    ] = 1,
+):
+    if sum(i is not None for i in (arxiv_id, file, query)) != 1:
+        print("[error]✘[/error] ", end="")
+        print("[error_msg]Give one of an ArXiv ID, --file or --query[/error_msg]")
+        raise typer.Exit(1)
+
+    if file is not None:
+        # Lines may have comments after a #
+        arxiv_ids = [line.split("#")[0].strip() for line in file]
+        _add_papers(ctx, [i for i in arxiv_ids if i], None, jobs)
+        return
+
+    if query is not None:
+        _add_papers(ctx, None, query, jobs)
+        return
+
+    from hpm.services.inspire_hep.cache import InspireCache
+    from hpm.services.inspire_hep.client import InspireHEP
+    from hpm.services.notion.objects.page import Page
+
+    from .schema import Schema
+
+    # Config and clients
     config = Config()
     token = config.load_token()
-    template = config.load_template("paper")
-    database_id = template["database_id"]
-    params = config.load_config_for_notion_client()
-    page_size = int(params["page_size"])
-
-    # Clients
-    inspire_hep = InspireHEP()
-    notion = Notion(token)
+    transport = _create_transport(config)
+    notion = _create_notion(config, token, transport)
+    schema = Schema(config.schema_file)
+    template = _compile_template(config, notion, schema, transport)
+    database_id = template.database_id
+    inspire_hep = InspireHEP(template.paper_properties, transport)
+    cache = InspireCache(inspire_hep, config.cache_file)
 
     print(f"[sect]>[/sect] Adding paper [num]{arxiv_id}[/num] to the database...")
     print()
@@ -174,88 +247,555 @@ def add(arxiv_id: str):
     # Retrieve the paper from InspireHEP ------------------------------------- #
     print("[info]i[/info] Retrieving paper from InspireHEP")
 
-    response = inspire_hep.get_paper(arxiv_id)
-    paper = Paper.from_response(response)
+    with phase("retrieve paper"):
+        paper = cache.get_paper(arxiv_id)
+        cache.save()
 
     # Check if it exists according to the title ------------------------------ #
     print("[info]i[/info] Checking if it's already in Notion")
 
-    # Query the database to get all pages
-    start_cursor = None
-    while True:
-        response = notion.query_database(database_id, start_cursor, page_size)
-        pages = [Page.from_response(data) for data in response["results"]]
-        titles = [page.title for page in pages]
-
-        if paper.title in titles:
-            page = pages[titles.index(paper.title)]
-            print("[error]✘[/error] ", end="")
-            print("[error_msg]Already in the database[/error_msg]")
-            print()
-            print(f"[hint]Check it here: [url]{page.url}")
-            raise typer.Exit(1)
+    with phase("find page"):
+        mirror = _open_mirror(ctx, config, template)
+        page = None
+        if mirror.is_fresh(database_id):
+            # The mirror does not know of pages deleted since its last full sync
+            page = mirror.find_by_title(paper.title)
+            if page is not None:
+                page = mirror.check(notion, page)
+
+        if page is None:
+            # Nor of pages added since its last sync, so let Notion find the
+            # page with the same title
+            title_property_name = template.properties["title"]
+            response = notion.query_database(
+                database_id,
+                page_size=1,
+                filter={
+                    "property": title_property_name,
+                    "title": {"equals": paper.title},
+                },
+            )
+            results = response["results"]
+            if len(results) > 0:
+                page = Page.from_response(results[0])
 
-        if response["has_more"]:
-            start_cursor = response["next_cursor"]
-        else:
-            break
+    if page is not None:
+        print("[error]✘[/error] ", end="")
+        print("[error_msg]Already in the database[/error_msg]")
+        print()
+        print(f"[hint]Check it here: [url]{page.url}")
+        raise typer.Exit(1)
 
-    # Create a new page ------------------------------------------------------ #
-    # Retreve the database to get the properties
-    response = notion.retrieve_database(database_id)
-    database = Database.from_response(response)
+    # Create a new page in the database -------------------------------------- #
+    print("[info]i[/info] Creating a new page in Notion")
 
-    # Prepare the page properties according to the template
-    properties = {}
-    for paper_property, page_property in template["properties"].items():
-        if page_property is None:
-            continue
+    with phase("create page"):
+        response = _create_page(paper, template, notion, schema)
+        new_page = Page.from_response(response)
+        mirror.upsert(new_page)
 
-        # Get paper property value
-        if "." not in paper_property:
-            value = getattr(paper, paper_property)
-        else:
-            first_level_property = paper_property.split(".")[0]
-            second_level_property = paper_property.split(".")[1]
-            value = [
-                getattr(i, second_level_property)
-                for i in getattr(paper, first_level_property)
-            ]
+        # Keep the BibTeX loaded for the new page
+        cache.update(paper)
+        cache.save()
 
-        # Get the page property class according to the database property type
-        database_property_type = database.properties[page_property].type
-        page_property_cls = ALL_PAGE_PROPERTIES[database_property_type]
+    print()
 
-        # Fill the value into the page property
-        properties[page_property] = page_property_cls(value)
+    # ------------------------------------------------------------------------ #
+    print("[done]✔[/done] Added")
+    print()
+    print(f"[hint]Check it here: [url]{new_page.url}")
 
-    # Create a new page in the database -------------------------------------- #
-    print("[info]i[/info] Creating a new page in Notion")
 
-    response = notion.create_page(database_id, properties)
-    new_page = Page.from_response(response)
+def _add_papers(
+    ctx: typer.Context, arxiv_ids: list[str] | None, query: str | None, jobs: int
+) -> None:
+    """Add many papers, given by their ids or an InspireHEP search.
+
+    The config, the mirror and the database schema are loaded once. Papers
+    already in the database are skipped, the others are retrieved from
+    InspireHEP in batches, the next batch while the pages of one are created.
+    """
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+    from hpm.services.inspire_hep.cache import InspireCache
+    from hpm.services.inspire_hep.client import InspireHEP
+    from hpm.services.inspire_hep.objects import Paper
+    from hpm.services.notion.objects.page import Page
+
+    from .schema import Schema
+
+    # Config
+    config = Config()
+    token = config.load_token()
+    params = config.load_config_for_notion_client()
+    page_size = int(params["page_size"])
+
+    # Clients, with a connection per thread kept open to each host
+    transport = _create_transport(config, jobs)
+    notion = _create_notion(config, token, transport)
+    schema = Schema(config.schema_file)
+    template = _compile_template(config, notion, schema, transport)
+    database_id = template.database_id
+    inspire_hep = InspireHEP(template.paper_properties, transport)
+    cache = InspireCache(inspire_hep, config.cache_file)
 
+    print("[sect]>[/sect] Adding papers to the database...")
+    print()
+
+    if query is not None:
+        print(f"[info]i[/info] Searching InspireHEP for [num]{escape(query)}[/num]")
+        with phase("search papers"):
+            arxiv_ids, n_skipped = _search_arxiv_ids(inspire_hep, query)
+
+        if n_skipped > 0:
+            print(f"[warn]![/warn] Skipping [num]{n_skipped}[/num] ", end="")
+            print("paper(s) without an ArXiv ID")
+
+    # Repeated ids are added once
+    arxiv_ids = list(dict.fromkeys(arxiv_ids))
+    n_papers = len(arxiv_ids)
+
+    # Check against the database in one pass --------------------------------- #
+    print("[info]i[/info] Syncing with the database in Notion")
+
+    with phase("sync mirror"):
+        mirror = _open_mirror(ctx, config, template)
+        full = mirror.database_id != database_id or mirror.last_edited_time is None
+        mirror.sync(notion, database_id, page_size)
+
+    print()
+
+    def find_page(arxiv_id: str) -> Page | None:
+        return mirror.find_by_eprint(arxiv_id) or mirror.find_by_inspire_id(arxiv_id)
+
+    # The mirror does not know of pages deleted since its last full sync, so
+    # each page found is retrieved once to check it is still in the database
+    checked: dict[str, Page | None] = {}
+
+    def check_page(page: Page | None) -> Page | None:
+        if full:
+            return page
+
+        if page is not None and page.id not in checked:
+            checked[page.id] = mirror.check(notion, page)
+
+        return checked[page.id] if page is not None else None
+
+    pages = {page.id: page for i in arxiv_ids if (page := find_page(i))}
+    if len(pages) > 0 and not full:
+        print("[info]i[/info] Checking the papers found in the database")
+
+        # Unless a full sync, which drops all the pages deleted since, takes
+        # fewer requests than retrieving each page found
+        if len(pages) > -(-len(mirror) // page_size):
+            with phase("check pages"):
+                mirror.sync(notion, database_id, page_size, full=True)
+            full = True
+        else:
+            with (
+                phase("check pages"),
+                ThreadPoolExecutor(max_workers=jobs) as checker,
+            ):
+                list(checker.map(check_page, pages.values()))
+
+        print()
+
+    def get_papers(arxiv_ids: list[str]) -> dict:
+        try:
+            papers = _get_papers(cache, arxiv_ids, template)
+        except Exception as error:
+            papers = [error] * len(arxiv_ids)
+
+        return dict(zip(arxiv_ids, papers))
+
+    def create_page(paper: Paper) -> Page:
+        response = _create_page(paper, template, notion, schema)
+        return Page.from_response(response)
+
+    # Add the papers --------------------------------------------------------- #
+    n_added = 0
+    n_existed = 0
+    n_failed = 0
+    i_paper = 0
+    added: dict[str, str] = {}
+    with (
+        ThreadPoolExecutor(max_workers=1) as fetcher,
+        ThreadPoolExecutor(max_workers=jobs) as writer,
+    ):
+        batches = list(_batched(arxiv_ids, INSPIRE_BATCH_SIZE))
+
+        def fetch(batch: list[str]) -> Future:
+            # Only the papers not in the database yet are retrieved
+            return fetcher.submit(get_papers, [i for i in batch if not find_page(i)])
+
+        next_papers = fetch(batches[0]) if len(batches) > 0 else None
+        for i_batch, batch in enumerate(batches):
+            papers = next_papers.result()
+            if i_batch + 1 < len(batches):
+                next_papers = fetch(batches[i_batch + 1])
+
+            # The page found for each paper, the page being created, the id it
+            # was given by before, or why it failed. Papers may be in the
+            # database under another id, or be given twice.
+            results: dict[str, Page | Future | str | Exception | None] = {}
+            for arxiv_id in batch:
+                paper = papers.get(arxiv_id)
+                if arxiv_id not in papers:
+                    results[arxiv_id] = find_page(arxiv_id)
+                elif not isinstance(paper, Paper):
+                    results[arxiv_id] = paper
+                elif page := check_page(
+                    mirror.find_by_eprint(paper.eprint)
+                    or mirror.find_by_inspire_id(paper.id)
+                    or mirror.find_by_title(paper.title)
+                ):
+                    results[arxiv_id] = page
+                elif paper.id in added:
+                    results[arxiv_id] = added[paper.id]
+                else:
+                    added[paper.id] = arxiv_id
+                    results[arxiv_id] = writer.submit(create_page, paper)
+
+            # Print the status of each paper in order
+            for arxiv_id, result in results.items():
+                i_paper += 1
+                paper_info = f"[num][{i_paper}/{n_papers}][/num] "
+                paper_info += f"[yellow]\\[{arxiv_id}][/yellow] "
+
+                if isinstance(result, Future):
+                    try:
+                        new_page = result.result()
+                    except Exception as error:
+                        result = error
+                    else:
+                        mirror.upsert(new_page, save=False)
+                        n_added += 1
+                        print(f"[done]✔[/done] {paper_info}", end="")
+                        print(escape(new_page.title or ""), width=100, soft_wrap=True)
+                        continue
+
+                if isinstance(result, Page):
+                    n_existed += 1
+                    print(f"[info]i[/info] {paper_info}", end="")
+                    print(f"Already in the database: [url]{result.url}[/url]")
+                elif isinstance(result, str):
+                    n_existed += 1
+                    print(f"[info]i[/info] {paper_info}", end="")
+                    print(f"Same paper as [yellow]\\[{result}][/yellow]")
+                else:
+                    n_failed += 1
+                    error = result or "Not found in InspireHEP"
+                    print(f"[error]✘[/error] {paper_info}", end="")
+                    print(f"[error_msg]{escape(str(error))}[/error_msg]")
+
+    with phase("save"):
+        mirror.save()
+        cache.save()
     print()
 
     # ------------------------------------------------------------------------ #
-    print("[done]✔[/done] Added")
+    print(f"[info]i[/info] [num]{n_added}[/num] added, ", end="")
+    print(f"[num]{n_existed}[/num] already in the database")
     print()
-    print(f"[hint]Check it here: [url]{new_page.url}")
+
+    if n_failed > 0:
+        print(f"[error]✘[/error] [num]{n_failed}[/num] ", end="")
+        print("[error_msg]paper(s) failed to add[/error_msg]")
+        raise typer.Exit(1)
+
+    print("[done]✔[/done] Added!")
+
+
+def _search_arxiv_ids(inspire_hep: InspireHEP, query: str) -> tuple[list[str], int]:
+    """Return the ArXiv IDs of the papers found by an InspireHEP search, and
+    the number of papers found without one."""
+    arxiv_ids = []
+    n_skipped = 0
+
+    page = 1
+    while True:
+        response = inspire_hep.search(
+            "literature",
+            query,
+            CITATIONS_BATCH_SIZE,
+            page,
+            fields="control_number,arxiv_eprints",
+        )
+        hits = response["hits"]["hits"]
+        for hit in hits:
+            eprints = hit["metadata"].get("arxiv_eprints", [])
+            if len(eprints) > 0:
+                arxiv_ids.append(eprints[0]["value"])
+            else:
+                n_skipped += 1
+
+        if len(hits) == 0 or page * CITATIONS_BATCH_SIZE >= response["hits"]["total"]:
+            break
+
+        page += 1
+
+    return arxiv_ids, n_skipped
+
+
+def _compile_template(
+    config: Config, notion: Notion, schema: Schema, transport: Transport
+) -> Template:
+    """Compile the paper template and check it against the database schema.
+
+    A template not matching the cached schema is checked again against the
+    schema retrieved from Notion, in case the database has changed since.
+    """
+    from .template import Template, TemplateError
+
+    try:
+        template = Template(config.load_template("paper"), transport=transport)
+        try:
+            template.bind(schema.get(notion, template.database_id))
+        except TemplateError:
+            template.bind(schema.refresh(notion, template.database_id))
+    except TemplateError as error:
+        print("[error]✘[/error] ", end="")
+        print(f"[error_msg]{escape(str(error))}[/error_msg]")
+        raise typer.Exit(1)
+
+    return template
+
+
+def _create_page(
+    paper: Paper, template: Template, notion: Notion, schema: Schema
+) -> dict:
+    """Create the page of a paper with a template bound to the cached schema.
+
+    If Notion rejects the page, the schema is retrieved again. The page is then
+    sent again if the schema has changed.
+    """
+    from hpm.services.notion.client import NotionError
+
+    database_id = template.database_id
+    property_types = schema.properties
+    try:
+        return notion.create_page(database_id, template.page_properties(paper))
+    except NotionError as error:
+        if error.code != "validation_error":
+            raise
+
+        if schema.refresh(notion, database_id) == property_types:
+            raise
+
+    template.bind(schema.properties)
+    return notion.create_page(database_id, template.page_properties(paper))
+
+
+def _open_mirror(ctx: typer.Context, config: Config, template: Template) -> Mirror:
+    """Open the mirror for the rest of the command, dropping the changes not
+    saved if it fails."""
+    from .mirror import Mirror
+
+    mirror = Mirror(config.mirror_file, template.properties)
+    ctx.call_on_close(mirror.close)
+    return mirror
+
+
+def _create_transport(config: Config, jobs: int = 1) -> Transport:
+    from hpm.services.transport import Transport
+
+    params = config.load_config_for_transport()
+    return Transport(
+        pool_maxsize=max(params.getint("pool_maxsize", 10), jobs),
+        connect_timeout=params.getfloat("connect_timeout", 10),
+        read_timeout=params.getfloat("read_timeout", 60),
+        gzip=params.getboolean("gzip", True),
+    )
+
+
+def _create_notion(config: Config, token: str, transport: Transport) -> Notion:
+    from hpm.services.notion.client import Notion
+    from hpm.services.notion.rate_limiter import RateLimiter
+
+    # Notion's rate limit is the default, other servers may allow more
+    params = config.load_config_for_notion_client()
+    rate_limiter = RateLimiter(
+        rate=params.getfloat("rate", 3), burst=params.getint("burst", 3)
+    )
+    return Notion(token, transport, rate_limiter)
+
+
+def _batched(iterable: Iterable, n: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, n)):
+        yield batch
+
+
+def _get_papers(
+    cache: InspireCache,
+    arxiv_ids: list[str | None],
+    template: Template,
+    revalidate: bool = False,
+) -> list[Paper | None]:
+    """Retrieve papers in a batch, with their BibTeX if the template needs it.
+
+    Updating papers must not miss changes to their records, so it revalidates
+    even the papers freshly cached, see `InspireCache.get_papers`.
+    """
+    papers = cache.get_papers([i for i in arxiv_ids if i], revalidate=revalidate)
+    papers = [papers[i] if i else None for i in arxiv_ids]
+
+    if template.needs_bibtex:
+        missing = [i for i in papers if i is not None and i.bibtex is None]
+        if len(missing) > 0:
+            entries = cache.client.get_bibtex([i.id for i in missing])
+            for paper in missing:
+                paper.bibtex = entries.get(paper.texkey)
+                cache.update(paper)
+
+    return papers
+
+
+def _write_changes(page: Page, changes: list[tuple], notion: Notion) -> dict:
+    """Write back the changed properties of a page, see `Template.update`."""
+    # Only send the changed properties, leaving e.g. a long abstract untouched
+    properties = {i[0]: page.properties[i[0]] for i in changes}
+    return notion.update_page(page.id, properties)
+
+
+def _is_deleted(error: Exception) -> bool:
+    """Whether writing to a page failed because it was archived or deleted."""
+    from hpm.services.notion.client import NotionError
+
+    if not isinstance(error, NotionError):
+        return False
+
+    # Notion refuses to edit an archived page, and no longer finds a deleted one
+    if error.code == "validation_error" and "archived" in str(error):
+        return True
+
+    return error.status == 404
+
+
+def _body_size(properties: dict) -> int:
+    """The size in bytes of the body updating these page properties."""
+    from hpm.services.notion.client import NotionBase
+
+    return len(json.dumps(NotionBase._update_page_body(properties)).encode())
+
+
+def _format_size(n_bytes: int) -> str:
+    if n_bytes < 1024:
+        return f"[num]{n_bytes}[/num] B"
+
+    return f"[num]{n_bytes / 1024:.1f}[/num] KiB"
+
+
+def _get_citation_counts(
+    inspire_hep: InspireHEP, arxiv_ids: list[str | None]
+) -> list[int | None]:
+    """Retrieve only the citation counts of papers in a batch."""
+    responses = inspire_hep.get_papers(
+        [i for i in arxiv_ids if i], chunk_size=CITATIONS_BATCH_SIZE
+    )
+
+    return [
+        responses[i]["metadata"].get("citation_count") if responses.get(i) else None
+        for i in arxiv_ids
+    ]
+
+
+def _diff_citation_count(
+    page: Page, template: Template, citation_count: int
+) -> list[tuple]:
+    """Set the citation count of a page if it changed.
+
+    Returns the changes like `Template.update`.
+    """
+    page_property = template.properties["citation_count"]
+    original_value = page.properties[page_property].value
+    if original_value == citation_count:
+        return []
+
+    page.properties[page_property].value = citation_count
+    return [(page_property, original_value, citation_count)]
+
+
+def _print_pipeline_stats(pipeline: Pipeline) -> None:
+    """Show the throughput of the pipeline stages and where their workers
+    spent the time, to tune the limits in the `[pipeline]` section.
+
+    Workers are blocked while the next stage is behind, the workers of the last
+    stage while the results are being printed.
+    """
+    from rich.table import Table
+
+    # The app theme does not inherit the default table styles
+    table = Table(
+        title=f"Pipeline of {pipeline.elapsed:.2f} s",
+        title_justify="left",
+        title_style="sect",
+        header_style="sect",
+    )
+    table.add_column("Stage")
+    for column in ["Workers", "Items", "Items/s", "Busy", "Idle", "Blocked"]:
+        table.add_column(column, justify="right")
+
+    for stats in pipeline.stats():
+        # Shares of the time of all workers of the stage
+        total = stats.workers * pipeline.elapsed or 1
+        table.add_row(
+            stats.name,
+            str(stats.workers),
+            str(stats.items),
+            f"{stats.items / (pipeline.elapsed or 1):.1f}",
+            f"{stats.busy / total:.0%}",
+            f"{stats.idle / total:.0%}",
+            f"{stats.blocked / total:.0%}",
+        )
+
+    console.print(table)
 
 
 @app.command(help="Update a paper or all papers")
-def update(arxiv_id: str):
+def update(
+    ctx: typer.Context,
+    arxiv_id: str,
+    jobs: Annotated[
+        int,
+        typer.Option(
+            "--jobs", "-j", min=1, help="Number of papers to update concurrently"
+        ),
+    ] = 1,
+    citations_only: Annotated[
+        bool,
+        typer.Option("--citations-only", help="Only update the citation counts"),
+    ] = False,
+    resume: Annotated[
+        bool,
+        typer.Option("--resume", help="Continue an interrupted update of all papers"),
+    ] = False,
+):
+    from hpm.services.inspire_hep.cache import InspireCache
+    from hpm.services.inspire_hep.client import InspireHEP
+    from hpm.services.notion.objects.page import Page
+
+    from .journal import Journal
+    from .pipeline import Pipeline
+    from .schema import Schema
+
+    if resume and arxiv_id != "all":
+        print("[error]✘[/error] ", end="")
+        print("[error_msg]Only an update of all papers can be resumed[/error_msg]")
+        raise typer.Exit(1)
+
     # Config
     config = Config()
     token = config.load_token()
-    template = config.load_template("paper")
-    database_id = template["database_id"]
     params = config.load_config_for_notion_client()
     page_size = int(params["page_size"])
 
-    # Clients
-    inspire_hep = InspireHEP()
-    notion = Notion(token)
+    # Clients, with a connection per thread kept open to each host
+    transport = _create_transport(config, jobs)
+    notion = _create_notion(config, token, transport)
+    schema = Schema(config.schema_file)
+    template = _compile_template(config, notion, schema, transport)
+    database_id = template.database_id
 
     if arxiv_id != "all":
         print(f"[sect]>[/sect] Updating paper [num]{arxiv_id}[/num]...")
@@ -264,28 +804,70 @@ def update(arxiv_id: str):
     print()
 
     # Get the eprint property name from template
-    eprint_property_name = template["properties"]["eprint"]
+    eprint_property_name = template.properties["eprint"]
 
-    # Query the database to get the page or all pages
-    existed_paper_pages = []
-    start_cursor = None
-    while True:
-        response = notion.query_database(database_id, start_cursor, page_size)
-        pages = [Page.from_response(data) for data in response["results"]]
-        page_eprints = [page.properties[eprint_property_name].value for page in pages]
-
-        if arxiv_id != "all":
-            if arxiv_id in page_eprints:
-                page = pages[page_eprints.index(arxiv_id)]
-                existed_paper_pages.append(page)
-                break
-        else:
-            existed_paper_pages += pages
+    if citations_only and template.properties.get("citation_count") is None:
+        print("[error]✘[/error] ", end="")
+        print("[error_msg]No property for citation_count in the template[/error_msg]")
+        raise typer.Exit(1)
 
-        if response["has_more"]:
-            start_cursor = response["next_cursor"]
+    # Updating all papers is recorded page by page in a journal, so that an
+    # interrupted run can be resumed without retrieving and diffing again the
+    # papers already done
+    journal = None
+    if arxiv_id == "all":
+        journal = Journal(config.journal_file)
+        if resume and journal.resume(database_id, citations_only):
+            print(f"[info]i[/info] Resuming, [num]{len(journal.done)}[/num] ", end="")
+            print("paper(s) already done")
+            print()
         else:
-            break
+            if resume:
+                print("[warn]![/warn] No interrupted update to resume")
+                print()
+            journal.start(database_id, citations_only)
+
+    # Look up the page in the local mirror, or let Notion find it by its eprint.
+    # Updating all papers touches every page anyway, so do a full sync of the
+    # mirror to drop pages archived since the last run, updating the pages as
+    # they arrive. Updating citation counts only must stay cheap, so sync just
+    # the pages edited since the last run.
+    mirror = _open_mirror(ctx, config, template)
+    existed_paper_pages = []
+    streamed = arxiv_id == "all" and not citations_only
+    if streamed:
+        existed_paper_pages = mirror.iter_sync(
+            notion, database_id, page_size, full=True, start_cursor=journal.cursor
+        )
+    elif arxiv_id == "all":
+        with phase("sync mirror"):
+            mirror.sync(notion, database_id, page_size)
+        existed_paper_pages = mirror.iter_pages()
+    else:
+        page = None
+        if mirror.is_fresh(database_id):
+            page = mirror.find_by_eprint(arxiv_id)
+        if page is not None:
+            # The mirror may lag behind Notion, so diff against the live page
+            page = mirror.check(notion, page)
+            if page is None:
+                mirror.save()
+
+        if page is None:
+            # The page may have been added since the mirror was synced
+            response = notion.query_database(
+                database_id,
+                page_size=1,
+                filter={
+                    "property": eprint_property_name,
+                    "rich_text": {"equals": arxiv_id},
+                },
+            )
+            if len(response["results"]) > 0:
+                page = Page.from_response(response["results"][0])
+
+        if page is not None:
+            existed_paper_pages.append(page)
 
     # Check if the paper is in the database
     if arxiv_id != "all" and len(existed_paper_pages) == 0:
@@ -294,54 +876,213 @@ def update(arxiv_id: str):
         raise typer.Exit(1)
 
     # Update the paper ------------------------------------------------------- #
-    n_pages = len(existed_paper_pages)
-    for i_page, page in enumerate(existed_paper_pages, start=1):
-        arxiv_id = page.properties[eprint_property_name].value
+    # The pages go through a pipeline of stages, each with its own workers:
+    # scanning the database, retrieving the papers from InspireHEP in batches,
+    # diffing them with the pages and writing the changes back to Notion. The
+    # queues between the stages are bounded, so slow writes do not hold up
+    # retrieving the next papers until the queues are full. Along with the
+    # mirror being read and written row by row and the cache evicting the least
+    # recently used papers, memory use does not grow with the database.
+    cache = None
+    if citations_only:
+        batch_size = CITATIONS_BATCH_SIZE
+        citations_client = InspireHEP(["citation_count"], transport)
+
+        def get_papers(eprints: list[str | None]) -> list:
+            return _get_citation_counts(citations_client, eprints)
+
+        def diff_page(page: Page, citation_count: int) -> list[tuple]:
+            return _diff_citation_count(page, template, citation_count)
+
+    else:
+        batch_size = INSPIRE_BATCH_SIZE
+        inspire_hep = InspireHEP(template.paper_properties, transport)
+        cache = InspireCache(inspire_hep, config.cache_file)
+
+        def get_papers(eprints: list[str | None]) -> list:
+            return _get_papers(cache, eprints, template, revalidate=True)
+
+        def diff_page(page: Page, paper: Paper) -> list[tuple]:
+            return template.update(page, paper)
+
+    def fetch_stage(pages: list[Page]) -> list[tuple]:
+        eprints = [page.properties[eprint_property_name].value for page in pages]
+        try:
+            with phase("retrieve papers"):
+                papers = get_papers(eprints)
+        except Exception as error:
+            papers = [error] * len(pages)
+
+        return list(zip(pages, eprints, papers))
+
+    def diff_stage(item: tuple) -> tuple:
+        page, arxiv_id, paper = item
+        try:
+            if isinstance(paper, Exception):
+                raise paper
+
+            if paper is None:
+                raise ValueError("Not found in InspireHEP")
+
+            # The pages may be the mirror's own, which must keep the values in
+            # Notion until the changes are written
+            page = copy.deepcopy(page)
+            return page, arxiv_id, diff_page(page, paper), None
+        except Exception as error:
+            return page, arxiv_id, [], error
+
+    def write_stage(item: tuple) -> tuple:
+        page, arxiv_id, changes, error = item
+        updated_page = None
+        if len(changes) > 0 and error is None:
+            try:
+                with phase("update page"):
+                    response = _write_changes(page, changes, notion)
+                updated_page = Page.from_response(response)
+            except Exception as error_:
+                error = error_
+
+        return page, arxiv_id, changes, updated_page, error
+
+    # The cursors of the batches the pages in the pipeline were streamed in
+    cursors: dict[str, str | None] = {}
+
+    def scan() -> Iterator[Page]:
+        for page in existed_paper_pages:
+            if journal is not None:
+                if page.id in journal.done:
+                    continue
+
+                cursors[page.id] = mirror.cursor if streamed else None
+
+            yield page
+
+    params = config.load_config_for_pipeline()
+    pipeline = Pipeline(
+        scan(),
+        queue_size=max(params.getint("queue_size", 100), batch_size),
+    )
+    pipeline.add_stage(
+        "fetch",
+        fetch_stage,
+        workers=params.getint("fetch_jobs", 2),
+        batch_size=batch_size,
+    )
+    pipeline.add_stage("diff", diff_stage)
+    pipeline.add_stage("write", write_stage, workers=jobs)
+
+    # The results are printed in order. The number of streamed pages is
+    # unknown until all of them have arrived.
+    n_pages = None
+    if isinstance(existed_paper_pages, list):
+        n_pages = len(existed_paper_pages)
+    elif not streamed:
+        n_pages = len(mirror)
+    n_failed = 0
+    n_updated = 0
+    n_deleted = 0
+    n_bytes_sent = 0
+    n_bytes_whole = 0
+    i_page = 0
+    for page, arxiv_id, changes, updated_page, error in pipeline:
+        i_page += 1
+        if updated_page is not None:
+            mirror.upsert(updated_page, save=False)
+            n_updated += 1
+
+            # Compare with sending the whole page, as updates used to
+            changed = {i[0] for i in changes}
+            n_bytes_sent += _body_size(
+                {k: v for k, v in page.properties.items() if k in changed}
+            )
+            n_bytes_whole += _body_size(page.properties)
+
+        # Pages deleted since the mirror was last synced are dropped from it
+        deleted = error is not None and _is_deleted(error)
+        if deleted:
+            mirror.remove(page.id, save=False)
+            n_deleted += 1
+
+        if journal is not None:
+            state = "unchanged"
+            if deleted:
+                state = "deleted"
+            elif error is not None:
+                state = "failed"
+            elif updated_page is not None:
+                state = "updated"
+            journal.record(page.id, state, cursors.pop(page.id))
+
+        # Only the papers whose citation counts changed are listed
+        if citations_only and len(changes) == 0 and error is None:
+            continue
+
         title = page.title
         print("[info]i[/info] ", end="")
-        print(f"Paper [num][{i_page}/{n_pages}][/num]: ", end="")
-        print(f"[yellow]\[{arxiv_id}][/yellow] {title}", width=100, soft_wrap=True)
-
-        # Retrieve the paper
-        response = inspire_hep.get_paper(arxiv_id)
-        paper = Paper.from_response(response)
-
-        # Update the page properties according to the template
-        need_update = False
-        for i_property, (paper_property, page_property) in enumerate(
-            template["properties"].items()
-        ):
-            if page_property is None:
-                continue
-
-            # Get paper property value
-            if "." not in paper_property:
-                value = getattr(paper, paper_property)
-            else:
-                first_level_property = paper_property.split(".")[0]
-                second_level_property = paper_property.split(".")[1]
-                value = [
-                    getattr(i, second_level_property)
-                    for i in getattr(paper, first_level_property)
-                ]
-
-            # Update the page property
-            if page.properties[page_property].value != value:
-                original_value = page.properties[page_property].value
-                print(f"  ┗ Updating {page_property}: {original_value} -> {value}")
-                page.properties[page_property].value = value
-                need_update = True
-
-            # Print a blank line
-            if (i_property == len(template["properties"]) - 1) and need_update:
-                print()
+        progress = i_page if n_pages is None else f"{i_page}/{n_pages}"
+        print(f"Paper [num][{progress}][/num]: ", end="")
+        print(
+            f"[yellow]\\[{arxiv_id}][/yellow] {title}",
+            width=100,
+            soft_wrap=True,
+        )
 
-        if need_update:
-            notion.update_page(page.id, page.properties)
+        for page_property, original_value, value in changes:
+            print(f"  ┗ Updating {page_property}: {original_value} -> {value}")
+
+        if deleted:
+            print("  ┗ [info]i[/info] Deleted from the database")
+        elif error is not None:
+            print("  ┗ [error]✘[/error] ", end="")
+            print(f"[error_msg]{escape(str(error))}[/error_msg]")
+            n_failed += 1
+
+        if len(changes) > 0 or error is not None:
+            print()
 
+    with phase("save"):
+        mirror.save()
+        if cache is not None:
+            cache.save()
     print()
 
+    if is_profiling():
+        _print_pipeline_stats(pipeline)
+        print()
+
+    # Failed papers are retried by resuming the update
+    if journal is not None and n_failed == 0:
+        journal.remove()
+    elif journal is not None:
+        journal.close()
+
+    # The mirror only keeps a few properties of the pages updated by their
+    # citation counts, so the whole pages are not known then
+    if n_updated > 0 and not citations_only:
+        sent = _format_size(n_bytes_sent)
+        saved = _format_size(n_bytes_whole - n_bytes_sent)
+        print(f"[info]i[/info] Sent {sent} of changes, ", end="")
+        print(f"saving {saved} over whole pages")
+        print()
+
+    if citations_only:
+        print(f"[info]i[/info] [num]{n_updated}[/num] of [num]{i_page}[/num] ", end="")
+        print("citation count(s) changed")
+        print()
+
+    if n_deleted > 0:
+        print(f"[info]i[/info] [num]{n_deleted}[/num] ", end="")
+        print("page(s) deleted from the database since the last sync")
+        print()
+
     # ------------------------------------------------------------------------ #
+    if n_failed > 0:
+        print(f"[error]✘[/error] [num]{n_failed}[/num] ", end="")
+        print("[error_msg]paper(s) failed to update[/error_msg]")
+        if journal is not None:
+            print("  Retry them with [num]hpm update all --resume[/num]")
+        raise typer.Exit(1)
+
     print("[done]✔[/done] Updated!")
 
 
@@ -354,6 +1095,10 @@ def info():
     print(f"App directory: [path]{config.app_dir}[/path]")
     print(f"Config file: [path]{config.config_file}[/path]")
     print(f"Token file: [path]{config.token_file}[/path]")
+    print(f"Mirror file: [path]{config.mirror_file}[/path]")
+    print(f"Cache file: [path]{config.cache_file}[/path]")
+    print(f"Schema file: [path]{config.schema_file}[/path]")
+    print(f"Journal file: [path]{config.journal_file}[/path]")
     print()
 
     if not config.app_dir.exists():
@@ -368,6 +1113,44 @@ def clean():
     print("[done]✔[/done] Cleaned!")
 
 
+cache_app = typer.Typer(help="Manage the cache of InspireHEP records")
+app.add_typer(cache_app, name="cache")
+
+
+@cache_app.command("stats", help="Show the cache statistics")
+def cache_stats():
+    from hpm.services.inspire_hep.cache import InspireCache
+    from hpm.services.inspire_hep.client import InspireHEP
+
+    config = Config()
+    cache = InspireCache(InspireHEP(), config.cache_file)
+    stats = cache.stats()
+
+    print("[sect]>[/sect] Showing the cache statistics...")
+    print()
+    print(f"Cache file: [path]{config.cache_file}[/path]")
+    print(f"Schema file: [path]{config.schema_file}[/path]")
+    print(f"Size: [num]{stats['size'] / 1024:.1f}[/num] KiB")
+    print(f"Papers: [num]{stats['papers']}[/num]")
+    print(f"Authors: [num]{stats['authors']}[/num]")
+    print(f"Jobs: [num]{stats['jobs']}[/num]")
+    print(f"Hits: [num]{stats['hits']}[/num]")
+    print(f"Revalidated: [num]{stats['revalidated']}[/num]")
+    print(f"Misses: [num]{stats['misses']}[/num]")
+
+
+@cache_app.command("clear", help="Remove all cached records")
+def cache_clear():
+    from hpm.services.inspire_hep.cache import InspireCache
+    from hpm.services.inspire_hep.client import InspireHEP
+
+    config = Config()
+    cache = InspireCache(InspireHEP(), config.cache_file)
+    cache.clear()
+
+    print("[done]✔[/done] Cleared!")
+
+
 def version_callback(value: bool):
     if value:
         print(
@@ -378,8 +1161,20 @@ def version_callback(value: bool):
         raise typer.Exit()
 
 
+def _finish_profiling(profiler, profile_output: Path | None) -> None:
+    profiler.stop()
+
+    print()
+    profiler.print_summary()
+
+    if profile_output is not None:
+        profiler.write_trace(profile_output)
+        print(f"[hint]Trace written to [path]{profile_output}")
+
+
 @app.callback()
 def main(
+    ctx: typer.Context,
     version: Annotated[
         Optional[bool],
         typer.Option(
@@ -390,4 +1185,24 @@ def main(
             help="Show the app version info",
         ),
     ] = None,
-): ...
+    profile: Annotated[
+        bool,
+        typer.Option(
+            "--profile", help="Show the latencies of requests and phases at exit"
+        ),
+    ] = False,
+    profile_output: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--profile-output",
+            dir_okay=False,
+            help="Also write them as a Chrome trace to this file",
+        ),
+    ] = None,
+):
+    if profile or profile_output is not None:
+        from .profiler import Profiler
+
+        profiler = Profiler()
+        profiler.start()
+        ctx.call_on_close(lambda: _finish_profiling(profiler, profile_output))
@@ -1,9 +1,8 @@
 import shutil
-from configparser import ConfigParser
+from configparser import ConfigParser, SectionProxy
 from pathlib import Path
 
 import typer
-import yaml
 
 
 class Config:
@@ -13,6 +12,10 @@ class Config:
         self.template_dir = self.app_dir / "templates"
         self.built_in_templates_dir = Path(__file__).parent / "templates"
         self.config_file = self.app_dir / "config.ini"
+        self.mirror_file = self.app_dir / "mirror.db"
+        self.cache_file = self.app_dir / "cache.json"
+        self.schema_file = self.app_dir / "schema.json"
+        self.journal_file = self.app_dir / "journal.jsonl"
 
     def save_config_for_notion_client(self, params: dict) -> None:
         config = ConfigParser()
@@ -25,6 +28,24 @@ class Config:
         config.read(self.config_file)
         return config["notion_client"]
 
+    def load_config_for_transport(self) -> SectionProxy:
+        # The section is optional, see `Transport` for the defaults
+        config = ConfigParser()
+        config.read(self.config_file)
+        if not config.has_section("transport"):
+            config.add_section("transport")
+
+        return config["transport"]
+
+    def load_config_for_pipeline(self) -> SectionProxy:
+        # The section is optional, see `hpm update` for the defaults
+        config = ConfigParser()
+        config.read(self.config_file)
+        if not config.has_section("pipeline"):
+            config.add_section("pipeline")
+
+        return config["pipeline"]
+
     def clean(self) -> None:
         if self.app_dir.exists():
             shutil.rmtree(self.app_dir)
@@ -45,13 +66,19 @@ class Config:
         return self.token_file.read_text()
 
     def save_template(self, name: str, template: dict) -> None:
+        import yaml
+
         self.template_file = self.template_dir / f"{name}.yml"
         self.template_file.write_text(yaml.dump(template, sort_keys=False))
 
     def load_template(self, name: str) -> dict:
+        import yaml
+
         self.template_file = self.template_dir / f"{name}.yml"
         return yaml.safe_load(self.template_file.read_text())
 
     def load_built_in_template(self, name: str) -> dict:
+        import yaml
+
         template_file = self.built_in_templates_dir / f"{name}.yml"
         return yaml.safe_load(template_file.read_text())
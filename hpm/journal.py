@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+
+class Journal:
+    """A write-ahead journal of `hpm update all`, to resume it if interrupted.
+
+    The first line of the JSONL file names the database and the mode of the
+    run. Each page done with is then appended as a line with its state, one of
+    `unchanged`, `updated`, `deleted` or `failed`, and the cursor of the batch
+    of pages it was fetched in from Notion. Pages are recorded in the order of
+    the database, so a resumed run can continue from the cursor of the last
+    page, or of the first failed one, skipping the pages already done.
+    """
+
+    def __init__(self, file: Path) -> None:
+        self.file = file
+
+        self.done: set[str] = set()
+        self.cursor: str | None = None
+        self._file = None
+
+    def start(self, database_id: str, citations_only: bool) -> None:
+        """Start the journal of a new run, dropping the previous one."""
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+
+        self._file = self.file.open("w")
+        self._write({"database_id": database_id, "citations_only": citations_only})
+
+    def resume(self, database_id: str, citations_only: bool) -> bool:
+        """Load the journal of an interrupted run in the same mode, to append
+        to it. Returns False if there is none to resume."""
+        if not self.file.exists():
+            return False
+
+        text = self.file.read_text()
+        lines = text.splitlines()
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, json.JSONDecodeError):
+            return False
+
+        if header != {"database_id": database_id, "citations_only": citations_only}:
+            return False
+
+        # The states of the pages, in the order they were first recorded
+        pages: dict[str, tuple[str, str | None]] = {}
+        cursor = None
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line may have been cut off by an interruption
+                continue
+
+            pages[record["id"]] = (record["state"], record["cursor"])
+            cursor = record["cursor"]
+
+        failed = [i for i in pages.values() if i[0] == "failed"]
+        self.cursor = failed[0][1] if len(failed) > 0 else cursor
+        self.done = {id for id, (state, _) in pages.items() if state != "failed"}
+
+        self._file = self.file.open("a")
+        if not text.endswith("\n"):
+            self._file.write("\n")
+
+        return True
+
+    def record(self, page_id: str, state: str, cursor: str | None) -> None:
+        self._write({"id": page_id, "state": state, "cursor": cursor})
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self) -> None:
+        self.close()
+        self.file.unlink(missing_ok=True)
+
+    def _write(self, record: dict) -> None:
+        # Flushed line by line, so that an interrupted run loses no pages
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
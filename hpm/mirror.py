@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+from .services.notion.client import Notion, NotionError
+from .services.notion.objects.page import Page
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    database_id TEXT,
+    synced_at REAL,
+    last_edited_time TEXT
+);
+CREATE TABLE IF NOT EXISTS pages (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    eprint TEXT,
+    inspire_id TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_title ON pages (title);
+CREATE INDEX IF NOT EXISTS pages_eprint ON pages (eprint);
+CREATE INDEX IF NOT EXISTS pages_inspire_id ON pages (inspire_id);
+"""
+
+
+class Mirror:
+    """A local copy of the paper database.
+
+    Pages are stored in an SQLite file and indexed by title, eprint and INSPIRE
+    id, so checking whether a paper is already in the database does not need to
+    page through the whole database in Notion. They are looked up and upserted
+    row by row, so the mirror of a large database is not held in memory.
+
+    The mirror remembers the latest `last_edited_time` it has seen, so `sync`
+    only fetches the pages edited after that point. Changes are written in a
+    transaction committed by `save`.
+
+    Notion does not return archived or deleted pages when querying a database,
+    so only a full sync, which starts from scratch, drops them. A page found in
+    the mirror has to be retrieved with `check` before relying on it.
+
+    Only the titles, urls and the page properties in `kept_properties` are
+    stored, see `iter_pages`.
+
+    Pages may be upserted by one thread while another one syncs the mirror.
+    """
+
+    def __init__(self, file: Path, properties: dict, ttl: float = 3600) -> None:
+        self.file = file
+        self.ttl = ttl
+
+        # Page property names used to build the indexes, from the template
+        self.eprint_property = properties.get("eprint")
+        self.id_property = properties.get("id")
+        self.url_property = properties.get("url")
+        # The page properties kept, also for `hpm update all --citations-only`
+        self.kept_properties = {
+            self.eprint_property,
+            self.id_property,
+            self.url_property,
+            properties.get("citation_count"),
+        } - {None}
+
+        self.database_id: str | None = None
+        self.synced_at: float | None = None
+        self.last_edited_time: str | None = None
+        # The cursor of the batch of the page last yielded by `iter_sync`
+        self.cursor: str | None = None
+        self._lock = threading.RLock()
+
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.file, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+        self.load()
+
+    def load(self) -> None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT database_id, synced_at, last_edited_time FROM meta"
+            ).fetchone()
+
+        if row is not None:
+            self.database_id, self.synced_at, self.last_edited_time = row
+
+    def save(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM meta")
+            self._db.execute(
+                "INSERT INTO meta VALUES (?, ?, ?)",
+                (self.database_id, self.synced_at, self.last_edited_time),
+            )
+            self._db.commit()
+
+    def close(self) -> None:
+        """Close the file, dropping the changes not saved."""
+        with self._lock:
+            self._db.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def iter_pages(self, batch_size: int = 100) -> Iterator[Page]:
+        """Iterate over the pages in the mirror, with only the kept properties,
+        reading them in batches."""
+        rowid = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT rowid, data FROM pages WHERE rowid > ? "
+                    "ORDER BY rowid LIMIT ?",
+                    (rowid, batch_size),
+                ).fetchall()
+
+            if len(rows) == 0:
+                return
+
+            for rowid, data in rows:
+                yield Page.from_cache(json.loads(data))
+
+    def is_fresh(self, database_id: str) -> bool:
+        if self.synced_at is None or self.database_id != database_id:
+            return False
+
+        return time.time() - self.synced_at < self.ttl
+
+    def sync(
+        self,
+        notion: Notion,
+        database_id: str,
+        page_size: int = 100,
+        full: bool = False,
+    ) -> int:
+        """Fold the pages edited since the last sync into the mirror.
+
+        A full sync is done if asked, if the mirror has never been synced or if
+        it belongs to another database. Returns the number of pages fetched.
+        """
+        return sum(1 for _ in self._sync(notion, database_id, page_size, full))
+
+    def iter_sync(
+        self,
+        notion: Notion,
+        database_id: str,
+        page_size: int = 100,
+        full: bool = False,
+        start_cursor: str | None = None,
+    ) -> Iterator[Page]:
+        """Sync the mirror like `sync`, yielding the pages as they are fetched.
+
+        The mirror is only marked as synced once all pages have been fetched.
+        Pages archived since the last sync are only dropped by a full sync, see
+        the class docs.
+
+        A full sync interrupted after a batch can be continued from the cursor
+        of that batch, see `cursor`. The pages fetched before are not refetched,
+        so the mirror is then not marked as synced.
+        """
+        pages = self._sync(notion, database_id, page_size, full, start_cursor)
+        for page in pages:
+            if page is not None:
+                yield page
+
+    def _sync(
+        self,
+        notion: Notion,
+        database_id: str,
+        page_size: int,
+        full: bool,
+        start_cursor: str | None = None,
+    ) -> Iterator[Page | None]:
+        # Yields None for archived pages
+        resumed = start_cursor is not None
+        if (
+            (full and not resumed)
+            or self.database_id != database_id
+            or self.last_edited_time is None
+        ):
+            self.clear()
+
+        self.database_id = database_id
+
+        # `last_edited_time` is truncated to the minute in Notion, so pages
+        # edited in the same minute as the high-water mark are fetched again.
+        # A resumed sync must query the pages like the full sync it continues.
+        filter = None
+        if self.last_edited_time is not None and not full:
+            filter = {
+                "timestamp": "last_edited_time",
+                "last_edited_time": {"on_or_after": self.last_edited_time},
+            }
+
+        # Pages may be updated while they are streamed, see `iter_sync`, which
+        # would move them around if sorted by `last_edited_time`
+        sorts = [{"timestamp": "created_time", "direction": "ascending"}]
+
+        batches = notion.iter_database_batches(
+            database_id, page_size, filter, sorts, start_cursor
+        )
+        for self.cursor, results in batches:
+            for data in results:
+                page = None
+                if not data.get("archived") and not data.get("in_trash"):
+                    page = Page.from_response(data)
+
+                if page is not None:
+                    self._index(page)
+                else:
+                    self._unindex(data["id"])
+
+                # Pages edited by the interrupted run were not seen, so the
+                # next sync must not skip them
+                if not resumed and (
+                    self.last_edited_time is None
+                    or data["last_edited_time"] > self.last_edited_time
+                ):
+                    self.last_edited_time = data["last_edited_time"]
+
+                yield page
+
+        if not resumed:
+            self.synced_at = time.time()
+        self.save()
+
+    def clear(self) -> None:
+        self.database_id = None
+        self.synced_at = None
+        self.last_edited_time = None
+        with self._lock:
+            self._db.execute("DELETE FROM pages")
+
+    def upsert(self, page: Page, save: bool = True) -> None:
+        self._index(page)
+
+        if save:
+            self.save()
+
+    def remove(self, page_id: str, save: bool = True) -> None:
+        self._unindex(page_id)
+
+        if save:
+            self.save()
+
+    def check(self, notion: Notion, page: Page) -> Page | None:
+        """Retrieve a page found in the mirror from Notion, returning None and
+        dropping it from the mirror if it has been archived or deleted since.
+
+        The mirror is not saved, see `upsert` and `remove`.
+        """
+        try:
+            data = notion.retrieve_page(page.id)
+        except NotionError as error:
+            if error.status != 404:
+                raise
+
+            data = None
+
+        if data is None or data.get("archived") or data.get("in_trash"):
+            self.remove(page.id, save=False)
+            return None
+
+        page = Page.from_response(data)
+        self.upsert(page, save=False)
+        return page
+
+    def find_by_title(self, title: str) -> Page | None:
+        return self._find("title", title)
+
+    def find_by_eprint(self, eprint: str) -> Page | None:
+        return self._find("eprint", eprint)
+
+    def find_by_inspire_id(self, inspire_id: str) -> Page | None:
+        return self._find("inspire_id", inspire_id)
+
+    def _find(self, column: str, value: str | None) -> Page | None:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT data FROM pages WHERE {column} = ? LIMIT 1", (value,)
+            ).fetchone()
+
+        return Page.from_cache(json.loads(row[0])) if row is not None else None
+
+    def _keys(self, page: Page) -> tuple[str | None, str | None, str | None]:
+        eprint = self._value(page, self.eprint_property)
+
+        if self.id_property is not None:
+            inspire_id = self._value(page, self.id_property)
+        else:
+            # The INSPIRE id is the last part of the url, e.g.
+            # https://inspirehep.net/literature/1405106
+            url = self._value(page, self.url_property)
+            inspire_id = url.rstrip("/").split("/")[-1] if url else None
+
+        return page.title, eprint, inspire_id
+
+    def _index(self, page: Page) -> None:
+        properties = {
+            k: v for k, v in page.properties.items() if k in self.kept_properties
+        }
+        page = Page(page.id, page.title, page.url, properties)
+        title, eprint, inspire_id = self._keys(page)
+        if inspire_id is not None:
+            inspire_id = str(inspire_id)
+
+        # Updated in place, so that `iter_pages` does not see the page again
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO pages VALUES (?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE "
+                "SET title = excluded.title, eprint = excluded.eprint, "
+                "inspire_id = excluded.inspire_id, data = excluded.data",
+                (page.id, title, eprint, inspire_id, json.dumps(page.as_dict())),
+            )
+
+    def _unindex(self, page_id: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM pages WHERE id = ?", (page_id,))
+
+    @staticmethod
+    def _value(page: Page, property_name: str | None):
+        if property_name is None or property_name not in page.properties:
+            return None
+
+        return page.properties[property_name].value
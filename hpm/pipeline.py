@@ -0,0 +1,290 @@
+"""A pipeline of stages running in threads, connected by bounded queues.
+
+Items flow from a source through the stages, each with its own number of
+workers. A stage waits while the queue to the next one is full, so a slow stage
+holds back the ones before it and only a bounded number of items are in flight
+at any time. The items come out of the pipeline in the order of the source:
+
+    pipeline = Pipeline(pages, queue_size=100)
+    pipeline.add_stage("fetch", fetch, workers=2, batch_size=50)
+    pipeline.add_stage("write", write, workers=4)
+    for result in pipeline:
+        ...
+
+An error raised by the source ends the items, and is raised once the items
+taken before it are out. An error raised by a stage stops the pipeline at once.
+
+Each stage counts the items it has processed and the time its workers spent
+working, waiting for items and waiting for room in the next queue, see `stats`.
+"""
+
+from __future__ import annotations
+
+import heapq
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import nullcontext
+from dataclasses import dataclass
+from itertools import count
+
+# Seconds between checks whether the pipeline has stopped, while waiting
+POLL_INTERVAL = 0.1
+
+# The end of the items, passed on to the next queue by the last worker
+_DONE = object()
+
+
+@dataclass(slots=True)
+class StageStats:
+    name: str
+    workers: int
+    items: int = 0
+    busy: float = 0
+    idle: float = 0
+    blocked: float = 0
+
+
+class _Stopped(Exception):
+    pass
+
+
+class _Stage:
+    def __init__(
+        self,
+        pipeline: Pipeline,
+        name: str,
+        function: Callable | None,
+        workers: int,
+        batch_size: int | None,
+        input: queue.Queue | None,
+    ) -> None:
+        self.pipeline = pipeline
+        self.function = function
+        self.batch_size = batch_size
+        self.input = input
+        self.output: queue.Queue = queue.Queue(pipeline.queue_size)
+        self.stats = StageStats(name, workers)
+
+        # Workers of a batched stage take turns to take whole batches
+        self._take_lock = threading.Lock() if batch_size is not None else nullcontext()
+        self._lock = threading.Lock()
+        self._n_running = workers
+        self._threads = [
+            threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+
+    def start(self) -> None:
+        for thread in self._threads:
+            thread.start()
+
+    def join(self) -> None:
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self) -> None:
+        try:
+            if self.input is None:
+                self._run_source()
+            else:
+                self._run_worker()
+
+            self._finish()
+        except _Stopped:
+            pass
+        except BaseException as error:
+            self.pipeline._stop(error)
+
+    def _run_source(self) -> None:
+        items = iter(self.pipeline.source)
+        for seq in count():
+            start = time.perf_counter()
+            try:
+                item = next(items, _DONE)
+            except Exception as error:
+                self.pipeline._source_error = error
+                item = _DONE
+            self.stats.busy += time.perf_counter() - start
+            if item is _DONE:
+                return
+
+            self.stats.items += 1
+            self._acquire_slot()
+            self._put((seq, item))
+
+    def _run_worker(self) -> None:
+        while True:
+            batch, done = self._take()
+
+            if len(batch) > 0:
+                start = time.perf_counter()
+                if self.batch_size is None:
+                    results = [self.function(batch[0][1])]
+                else:
+                    results = self.function([item for _, item in batch])
+
+                with self._lock:
+                    self.stats.busy += time.perf_counter() - start
+                    self.stats.items += len(batch)
+
+                for (seq, _), result in zip(batch, results):
+                    self._put((seq, result))
+
+            if done:
+                # Let the other workers of this stage see the end too
+                self.input.put(_DONE)
+                return
+
+    def _take(self) -> tuple[list, bool]:
+        """Take the next item or batch, and whether the end has been reached."""
+        start = time.perf_counter()
+        batch = []
+        done = False
+        with self._take_lock:
+            while len(batch) < (self.batch_size or 1):
+                item = self._get()
+                if item is _DONE:
+                    done = True
+                    break
+
+                batch.append(item)
+
+        with self._lock:
+            self.stats.idle += time.perf_counter() - start
+
+        return batch, done
+
+    def _acquire_slot(self) -> None:
+        # Results waiting for the ones before them count as in flight too
+        start = time.perf_counter()
+        while not self.pipeline._slots.acquire(timeout=POLL_INTERVAL):
+            if self.pipeline._stopped.is_set():
+                raise _Stopped
+
+        self.stats.blocked += time.perf_counter() - start
+
+    def _finish(self) -> None:
+        with self._lock:
+            self._n_running -= 1
+            if self._n_running > 0:
+                return
+
+        self._put(_DONE)
+
+    def _get(self):
+        while True:
+            if self.pipeline._stopped.is_set():
+                raise _Stopped
+
+            try:
+                return self.input.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                pass
+
+    def _put(self, item) -> None:
+        start = time.perf_counter()
+        while True:
+            if self.pipeline._stopped.is_set():
+                raise _Stopped
+
+            try:
+                self.output.put(item, timeout=POLL_INTERVAL)
+                break
+            except queue.Full:
+                pass
+
+        with self._lock:
+            self.stats.blocked += time.perf_counter() - start
+
+
+class Pipeline:
+    """Stages applied in turn to the items of a source, see the module docs."""
+
+    def __init__(self, source: Iterable, queue_size: int = 100) -> None:
+        self.source = source
+        self.queue_size = queue_size
+
+        self.stages: list[_Stage] = [
+            _Stage(self, "source", None, 1, None, None),
+        ]
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self._stopped = threading.Event()
+        self._error: BaseException | None = None
+        self._source_error: Exception | None = None
+        self._slots: threading.Semaphore | None = None
+
+    def add_stage(
+        self,
+        name: str,
+        function: Callable,
+        workers: int = 1,
+        batch_size: int | None = None,
+    ) -> None:
+        """Add a stage calling `function` on each item, or on lists of up to
+        `batch_size` items, in which case it returns a list of the results."""
+        if batch_size is not None and batch_size > self.queue_size:
+            raise ValueError("The batch size cannot exceed the queue size")
+
+        input = self.stages[-1].output
+        self.stages.append(_Stage(self, name, function, workers, batch_size, input))
+
+    def __iter__(self) -> Iterator:
+        # The items in the queues, in the workers and waiting to come out
+        n_workers = sum(i.stats.workers for i in self.stages)
+        self._slots = threading.Semaphore(
+            self.queue_size * len(self.stages) + n_workers
+        )
+
+        self.started_at = time.perf_counter()
+        for stage in self.stages:
+            stage.start()
+
+        # Results finished out of order wait until the ones before them are out
+        output = self.stages[-1].output
+        pending: list[tuple[int, object]] = []
+        next_seq = 0
+        try:
+            while True:
+                item = self._get(output)
+                if item is _DONE:
+                    break
+
+                heapq.heappush(pending, item)
+                while pending and pending[0][0] == next_seq:
+                    self._slots.release()
+                    yield heapq.heappop(pending)[1]
+                    next_seq += 1
+        finally:
+            self._stopped.set()
+            for stage in self.stages:
+                stage.join()
+            self.finished_at = time.perf_counter()
+
+        if self._source_error is not None:
+            raise self._source_error
+
+    def stats(self) -> list[StageStats]:
+        return [stage.stats for stage in self.stages]
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at or time.perf_counter()
+        return end - (self.started_at or end)
+
+    def _get(self, output: queue.Queue):
+        while True:
+            if self._error is not None:
+                raise self._error
+
+            try:
+                return output.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                pass
+
+    def _stop(self, error: BaseException) -> None:
+        if self._error is None:
+            self._error = error
+        self._stopped.set()
@@ -0,0 +1,199 @@
+"""Profiling of the commands, see `hpm --profile`.
+
+A `Profiler` collects the requests reported by the service clients and the
+phases of a command marked with `phase`, including the rendering of the console
+output. At exit, it shows a histogram of their latencies and can write them as a
+Chrome trace, to be opened in chrome://tracing or https://ui.perfetto.dev.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from hpm.services.instrumentation import RequestEvent
+
+# Upper bounds in seconds of the latency histogram buckets, the last one open
+BUCKETS = [0.001, 0.01, 0.1, 1]
+BUCKET_NAMES = ["<1ms", "<10ms", "<100ms", "<1s", "≥1s"]
+
+# The profiler of the running command, if any
+_profiler: Profiler | None = None
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    category: str
+    start: float
+    duration: float
+    thread_id: int
+    args: dict
+
+
+class Profiler:
+    def __init__(self) -> None:
+        self.started_at = time.perf_counter()
+        self.spans: list[Span] = []
+
+    def start(self) -> None:
+        global _profiler
+        from hpm.services.instrumentation import add_hook
+
+        add_hook(self.record_request)
+        _profiler = self
+
+    def stop(self) -> None:
+        global _profiler
+        from hpm.services.instrumentation import remove_hook
+
+        remove_hook(self.record_request)
+        _profiler = None
+
+    def record_request(self, event: RequestEvent) -> None:
+        args = {
+            "status": event.status,
+            "retries": event.retries,
+            "bytes_sent": event.bytes_sent,
+            "bytes_received": event.bytes_received,
+        }
+        self.spans.append(
+            Span(
+                f"{event.method} {event.endpoint}",
+                event.service,
+                event.start,
+                event.latency,
+                event.thread_id,
+                args,
+            )
+        )
+
+    @contextmanager
+    def phase(self, name: str, category: str = "phase"):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.spans.append(
+                Span(name, category, start, duration, threading.get_ident(), {})
+            )
+
+    def summary(self) -> list[dict]:
+        """The latencies of the spans grouped by their categories and names,
+        the longest first."""
+        groups: dict[tuple[str, str], list[Span]] = {}
+        for span in self.spans:
+            groups.setdefault((span.category, span.name), []).append(span)
+
+        rows = []
+        for (category, name), spans in groups.items():
+            durations = sorted(i.duration for i in spans)
+            n = len(durations)
+            histogram = [0] * len(BUCKET_NAMES)
+            for duration in durations:
+                histogram[sum(duration >= i for i in BUCKETS)] += 1
+
+            rows.append(
+                {
+                    "category": category,
+                    "name": name,
+                    "count": n,
+                    "total": sum(durations),
+                    "p50": durations[n // 2],
+                    "p95": durations[min(n - 1, n * 19 // 20)],
+                    "max": durations[-1],
+                    "histogram": histogram,
+                    "retries": sum(i.args.get("retries", 0) for i in spans),
+                    "bytes_sent": sum(i.args.get("bytes_sent", 0) for i in spans),
+                    "bytes_received": sum(
+                        i.args.get("bytes_received", 0) for i in spans
+                    ),
+                }
+            )
+
+        return sorted(rows, key=lambda i: i["total"], reverse=True)
+
+    def print_summary(self) -> None:
+        from rich.table import Table
+
+        from .utils import console
+
+        elapsed = time.perf_counter() - self.started_at
+        # The app theme does not inherit the default table styles
+        table = Table(
+            title=f"Profile of {elapsed:.2f} s",
+            title_justify="left",
+            title_style="sect",
+            header_style="sect",
+        )
+        table.add_column("Phase")
+        for column in ["Count", "Total", "p50", "p95", "Max", *BUCKET_NAMES]:
+            table.add_column(column, justify="right")
+        table.add_column("Retries", justify="right")
+        table.add_column("KiB sent/received", justify="right")
+
+        for row in self.summary():
+            kib = ""
+            if row["category"] not in ("phase", "console"):
+                kib = f"{row['bytes_sent'] / 1024:.1f}/"
+                kib += f"{row['bytes_received'] / 1024:.1f}"
+
+            table.add_row(
+                f"[dim]{row['category']}[/dim] {row['name']}",
+                str(row["count"]),
+                f"{row['total']:.2f} s",
+                _format_duration(row["p50"]),
+                _format_duration(row["p95"]),
+                _format_duration(row["max"]),
+                *(str(i) if i else "" for i in row["histogram"]),
+                str(row["retries"]) if row["retries"] else "",
+                kib,
+            )
+
+        console.print(table)
+
+    def write_trace(self, file: Path) -> None:
+        """Write the spans in the Chrome trace event format."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": (span.start - self.started_at) * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": span.args,
+            }
+            for span in self.spans
+        ]
+        data = {"traceEvents": events, "displayTimeUnit": "ms"}
+        file.write_text(json.dumps(data))
+
+
+def phase(name: str, category: str = "phase"):
+    """Time a phase of the running command, if it is profiled."""
+    if _profiler is None:
+        return nullcontext()
+
+    return _profiler.phase(name, category)
+
+
+def is_profiling() -> bool:
+    return _profiler is not None
+
+
+def _format_duration(seconds: float) -> str:
+    if seconds < 1:
+        return f"{seconds * 1000:.1f} ms"
+
+    return f"{seconds:.2f} s"
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+
+from .services.notion.client import Notion
+from .services.notion.objects.page_properties import ALL_PAGE_PROPERTIES
+
+
+class Schema:
+    """The property types of the paper database, cached on disk.
+
+    Creating a page only needs the types of the database properties, so they
+    are not retrieved from Notion each time a paper is added. A changed schema
+    shows up as a page rejected by Notion, after which `refresh` is called.
+    """
+
+    def __init__(self, file: Path) -> None:
+        self.file = file
+
+        self.database_id: str | None = None
+        self.properties: dict[str, str] | None = None
+        self._lock = threading.Lock()
+
+        self.load()
+
+    def load(self) -> None:
+        if not self.file.exists():
+            return
+
+        data = json.loads(self.file.read_text())
+        self.database_id = data["database_id"]
+        self.properties = data["properties"]
+
+    def save(self) -> None:
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+
+        data = {
+            "database_id": self.database_id,
+            "properties": self.properties,
+        }
+        self.file.write_text(json.dumps(data, indent=2))
+
+    def get(self, notion: Notion, database_id: str) -> dict[str, str]:
+        """Return the types of the database properties by their names,
+        retrieving them if not cached yet."""
+        if self.database_id != database_id or self.properties is None:
+            self.refresh(notion, database_id)
+
+        return self.properties
+
+    def refresh(self, notion: Notion, database_id: str) -> dict[str, str]:
+        # Pages may be created concurrently, all finding the schema outdated
+        with self._lock:
+            data = notion.retrieve_database(database_id)
+
+            self.database_id = database_id
+            self.properties = {
+                name: value["type"]
+                for name, value in data["properties"].items()
+                if value["type"] in ALL_PAGE_PROPERTIES
+            }
+            self.save()
+
+        return self.properties
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+try:
+    import httpx
+except ImportError as error:
+    raise ImportError(
+        "The async clients need httpx: pip install 'hep-paper-manager[async]'"
+    ) from error
+
+from .. import instrumentation
+from .client import InspireHEPBase
+
+
+class AsyncInspireHEP(InspireHEPBase):
+    """The asyncio version of `InspireHEP`, with the same methods as coroutines.
+
+    All requests share one `httpx.AsyncClient`, and the chunks of `get_papers`
+    and `get_bibtex` are searched for concurrently. Close it with `aclose` or
+    use `async with`.
+    """
+
+    def __init__(
+        self,
+        paper_properties: list[str] | None = None,
+        client: httpx.AsyncClient | None = None,
+        base_url: str | None = None,
+    ) -> None:
+        super().__init__(paper_properties, base_url)
+        self.client = client or httpx.AsyncClient()
+
+    async def __aenter__(self) -> AsyncInspireHEP:
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def get(
+        self, identifier_type: str, identifier_value: str, fields: str | None = None
+    ) -> dict:
+        response = await self.request(identifier_type, identifier_value, fields)
+        response.raise_for_status()
+
+        return response.json()
+
+    async def request(
+        self,
+        identifier_type: str,
+        identifier_value: str,
+        fields: str | None = None,
+        headers: dict | None = None,
+    ) -> httpx.Response:
+        url = f"{self.base_url}/{identifier_type}/{identifier_value}"
+        params = {"fields": fields} if fields else None
+
+        return await self._get(url, params=params, headers=headers)
+
+    async def search(
+        self,
+        identifier_type: str,
+        query: str,
+        size: int = 25,
+        page: int = 1,
+        fields: str | None = None,
+    ) -> dict:
+        url = f"{self.base_url}/{identifier_type}"
+        params = self._search_params(query, size, page, fields)
+        response = await self._get(url, params=params)
+        response.raise_for_status()
+
+        return response.json()
+
+    async def get_paper(self, identifier_value: str) -> dict:
+        identifier_type = self.paper_identifier_type(identifier_value)
+        return await self.get(identifier_type, identifier_value, self.paper_fields)
+
+    async def get_papers(
+        self,
+        identifier_values: list[str],
+        chunk_size: int = 50,
+        fields: str | None = None,
+    ) -> dict[str, dict | None]:
+        """Retrieve many papers with a few concurrent literature searches.
+
+        See `InspireHEP.get_papers`.
+        """
+        fields = fields or self.paper_fields
+        papers = {i: None for i in identifier_values}
+        requested = self._requested_keys(identifier_values)
+
+        async def search_chunk(keys: list[str]) -> None:
+            query = self._query(keys)
+
+            page = 1
+            n_hits = 0
+            while True:
+                response = await self.search(
+                    "literature", query, chunk_size, page, fields
+                )
+                hits = response["hits"]["hits"]
+                self._match_hits(hits, requested, papers)
+
+                n_hits += len(hits)
+                if len(hits) == 0 or n_hits >= response["hits"]["total"]:
+                    break
+
+                page += 1
+
+        keys = list(requested)
+        await asyncio.gather(
+            *(
+                search_chunk(keys[start : start + chunk_size])
+                for start in range(0, len(keys), chunk_size)
+            )
+        )
+
+        return papers
+
+    async def get_bibtex(
+        self, identifier_values: list[str], chunk_size: int = 50
+    ) -> dict[str, str]:
+        """Retrieve the BibTeX entries of many papers with a few concurrent
+        searches.
+
+        See `InspireHEP.get_bibtex`.
+        """
+        url = f"{self.base_url}/literature"
+        entries = {}
+
+        async def search_chunk(identifier_values: list[str]) -> None:
+            query = self._query(identifier_values)
+
+            page = 1
+            while True:
+                params = self._search_params(query, chunk_size, page, format="bibtex")
+                response = await self._get(url, params=params)
+                response.raise_for_status()
+
+                page_entries = self._parse_bibtex(response.text)
+                entries.update(page_entries)
+
+                if len(page_entries) < chunk_size:
+                    break
+
+                page += 1
+
+        await asyncio.gather(
+            *(
+                search_chunk(identifier_values[start : start + chunk_size])
+                for start in range(0, len(identifier_values), chunk_size)
+            )
+        )
+
+        return entries
+
+    async def get_author(self, identifier_value: str) -> dict:
+        return await self.get("authors", identifier_value)
+
+    async def get_job(self, identifier_value: str) -> dict:
+        return await self.get("jobs", identifier_value)
+
+    async def _get(self, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self.client.get(url, **kwargs)
+        instrumentation.emit("inspire_hep", response, start)
+
+        return response
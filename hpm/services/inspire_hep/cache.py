@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from pathlib import Path
+
+import requests
+from tinydb import TinyDB
+
+from .client import InspireHEP
+from .objects import Author, Job, Paper
+
+OBJECT_CLASSES = {"paper": Paper, "author": Author, "job": Job}
+
+# Seconds before a cached object has to be revalidated with InspireHEP
+DEFAULT_TTLS = {"paper": 24 * 3600, "author": 7 * 24 * 3600, "job": 24 * 3600}
+
+# Fields of the literature records searched for to revalidate cached papers.
+# Their `updated` and `revision_id` are always included.
+VERSION_FIELDS = "control_number,arxiv_eprints"
+
+
+class InspireCache:
+    """Papers, authors and jobs retrieved from InspireHEP, cached on disk.
+
+    Objects are cached by their record ids, and papers also by their arXiv ids.
+    Expired objects are revalidated with conditional requests, so unchanged
+    records only cost a 304 response. Papers searched for in a batch are
+    revalidated by comparing the versions of their records instead. Once there
+    are more than `max_entries` objects, the least recently used ones are
+    evicted as soon as new ones are stored, so memory stays bounded however
+    many papers are retrieved.
+
+    The cache may be used by several threads at once. Requests to InspireHEP
+    are sent without holding the lock, so they can overlap.
+    """
+
+    def __init__(
+        self,
+        client: InspireHEP,
+        file: Path,
+        ttls: dict[str, float] | None = None,
+        max_entries: int = 10000,
+    ) -> None:
+        self.client = client
+        self.file = file
+        self.ttls = DEFAULT_TTLS | (ttls or {})
+        self.max_entries = max_entries
+
+        self.entries: dict[str, dict] = {}
+        self.counters = {"hits": 0, "misses": 0, "revalidated": 0}
+        self._keys: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        self.load()
+
+    def load(self) -> None:
+        if not self.file.exists():
+            return
+
+        with TinyDB(self.file) as db:
+            meta = db.table("meta").all()
+            if len(meta) > 0:
+                self.counters = meta[0]["counters"]
+
+            entries = db.table("entries").all()
+            for entry in sorted(entries, key=lambda i: i["accessed_at"]):
+                self._index(dict(entry))
+
+        self._evict()
+
+    def save(self) -> None:
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._lock, TinyDB(self.file) as db:
+            db.drop_tables()
+            db.table("meta").insert({"counters": self.counters})
+            db.table("entries").insert_multiple(self.entries.values())
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries = {}
+            self.counters = {"hits": 0, "misses": 0, "revalidated": 0}
+            self._keys = {}
+
+        if self.file.exists():
+            self.file.unlink()
+
+    def stats(self) -> dict:
+        stats = {f"{kind}s": 0 for kind in OBJECT_CLASSES}
+        with self._lock:
+            for entry in self.entries.values():
+                stats[f"{entry['kind']}s"] += 1
+            stats |= self.counters
+
+        stats["size"] = self.file.stat().st_size if self.file.exists() else 0
+        return stats
+
+    def get_paper(self, identifier_value: str) -> Paper:
+        identifier_type = self.client.paper_identifier_type(identifier_value)
+        fields = self.client.paper_fields
+        return self._get("paper", identifier_type, identifier_value, fields)
+
+    def get_papers(
+        self,
+        identifier_values: list[str],
+        chunk_size: int = 50,
+        revalidate: bool = False,
+    ) -> dict[str, Paper | None]:
+        """Retrieve many papers, searching only for those not freshly cached.
+
+        With `revalidate`, all cached papers are checked against InspireHEP,
+        searching for only the versions of their records first, and retrieved
+        again if their records have changed since.
+
+        Papers not found are mapped to None, see `InspireHEP.get_papers`.
+        """
+        papers = {}
+        missing = []
+        cached = {}
+        fields = self.client.paper_fields
+        with self._lock:
+            for identifier_value in identifier_values:
+                entry = self._lookup("paper", identifier_value, fields)
+                if entry is None:
+                    missing.append(identifier_value)
+                elif revalidate or not self._is_fresh(entry):
+                    cached[identifier_value] = entry
+                else:
+                    self.counters["hits"] += 1
+                    papers[identifier_value] = self._load(entry)
+
+        if len(cached) > 0:
+            versions = self.client.get_papers(
+                list(cached), chunk_size, fields=VERSION_FIELDS
+            )
+            with self._lock:
+                for identifier_value, entry in cached.items():
+                    data = versions[identifier_value]
+                    version = _version(data) if data is not None else None
+                    if version is not None and version == _version(entry):
+                        self.counters["revalidated"] += 1
+                        entry["stored_at"] = time.time()
+                        papers[identifier_value] = self._load(entry)
+                    else:
+                        missing.append(identifier_value)
+
+        if len(missing) > 0:
+            responses = self.client.get_papers(missing, chunk_size)
+            for identifier_value, data in responses.items():
+                if data is None:
+                    continue
+
+                paper = Paper.from_response(data)
+                with self._lock:
+                    self.counters["misses"] += 1
+                    self._put("paper", paper, fields, data)
+                papers[identifier_value] = paper
+
+        return {i: papers.get(i) for i in identifier_values}
+
+    def get_author(self, identifier_value: str) -> Author:
+        return self._get("author", "authors", identifier_value)
+
+    def get_job(self, identifier_value: str) -> Job:
+        return self._get("job", "jobs", identifier_value)
+
+    def update(self, obj: Paper | Author | Job) -> None:
+        """Replace a cached object, e.g. after its BibTeX is loaded."""
+        kind = {cls: kind for kind, cls in OBJECT_CLASSES.items()}[type(obj)]
+        with self._lock:
+            entry = self.entries.get(f"{kind}:{obj.id}")
+
+            if entry is not None:
+                entry["data"] = obj.as_dict()
+
+    def _get(
+        self,
+        kind: str,
+        identifier_type: str,
+        identifier_value: str,
+        fields: str | None = None,
+    ) -> Paper | Author | Job:
+        with self._lock:
+            entry = self._lookup(kind, identifier_value, fields)
+            if entry is not None and self._is_fresh(entry):
+                self.counters["hits"] += 1
+                return self._load(entry)
+
+        # Revalidate an expired entry
+        headers = {}
+        if entry is not None and entry["etag"] is not None:
+            headers["If-None-Match"] = entry["etag"]
+        if entry is not None and entry["last_modified"] is not None:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self.client.request(
+            identifier_type, identifier_value, fields, headers
+        )
+
+        if entry is not None and response.status_code == 304:
+            with self._lock:
+                self.counters["revalidated"] += 1
+                entry["stored_at"] = time.time()
+                return self._load(entry)
+
+        response.raise_for_status()
+
+        data = response.json()
+        obj = OBJECT_CLASSES[kind].from_response(data)
+        with self._lock:
+            self.counters["misses"] += 1
+            self._put(kind, obj, fields, data, response)
+
+        return obj
+
+    def _put(
+        self,
+        kind: str,
+        obj: Paper | Author | Job,
+        fields: str | None,
+        data: dict,
+        response: requests.Response | None = None,
+    ) -> None:
+        keys = [str(obj.id)]
+        if kind == "paper" and obj.eprint is not None:
+            keys.append(obj.eprint)
+
+        old_entry = self.entries.get(f"{kind}:{obj.id}")
+        if old_entry is not None:
+            self._unindex(old_entry)
+
+        now = time.time()
+        headers = response.headers if response is not None else {}
+        self._index(
+            {
+                "kind": kind,
+                "id": str(obj.id),
+                "keys": keys,
+                "fields": fields,
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+                "updated": data.get("updated"),
+                "revision_id": data.get("revision_id"),
+                "stored_at": now,
+                "accessed_at": now,
+                "data": obj.as_dict(),
+            }
+        )
+        self._evict()
+
+    def _lookup(
+        self, kind: str, identifier_value: str, fields: str | None
+    ) -> dict | None:
+        entry_id = self._keys.get(f"{kind}:{identifier_value}")
+        if entry_id is None:
+            return None
+
+        # The entry must have been parsed from at least the requested fields
+        entry = self.entries[entry_id]
+        if entry["fields"] is not None and (
+            fields is None
+            or not set(fields.split(",")) <= set(entry["fields"].split(","))
+        ):
+            return None
+
+        return entry
+
+    def _is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry["stored_at"] < self.ttls[entry["kind"]]
+
+    def _load(self, entry: dict) -> Paper | Author | Job:
+        entry["accessed_at"] = time.time()
+        # Mark it as the most recently used, unless evicted meanwhile
+        entry_id = f"{entry['kind']}:{entry['id']}"
+        if self.entries.get(entry_id) is entry:
+            self.entries[entry_id] = self.entries.pop(entry_id)
+        data = copy.deepcopy(entry["data"])
+        return OBJECT_CLASSES[entry["kind"]].from_cache(data)
+
+    def _evict(self) -> None:
+        # The entries are ordered from the least to the most recently used
+        while len(self.entries) > self.max_entries:
+            self._unindex(next(iter(self.entries.values())))
+
+    def _index(self, entry: dict) -> None:
+        entry_id = f"{entry['kind']}:{entry['id']}"
+        self.entries[entry_id] = entry
+        for key in entry["keys"]:
+            self._keys[f"{entry['kind']}:{key}"] = entry_id
+
+    def _unindex(self, entry: dict) -> None:
+        entry_id = f"{entry['kind']}:{entry['id']}"
+        self.entries.pop(entry_id, None)
+        for key in entry["keys"]:
+            if self._keys.get(f"{entry['kind']}:{key}") == entry_id:
+                del self._keys[f"{entry['kind']}:{key}"]
+
+
+def _version(data: dict) -> tuple | None:
+    # A record or cache entry without a version is never up to date
+    version = (data.get("updated"), data.get("revision_id"))
+    return version if version != (None, None) else None
@@ -1,26 +1,224 @@
 from __future__ import annotations
+
+import os
+import re
+import time
+
 import requests
 
+from .. import instrumentation
+from ..transport import Transport, get_default_transport
+from .objects import Paper
+
+
+class InspireHEPBase:
+    """The settings and request logic shared by `InspireHEP` and
+    `AsyncInspireHEP`."""
+
+    def __init__(
+        self, paper_properties: list[str] | None = None, base_url: str | None = None
+    ) -> None:
+        self.base_url = base_url or os.getenv(
+            "HPM_INSPIRE_BASE_URL", "https://inspirehep.net/api"
+        )
+
+        # Only request the record fields needed to parse the paper properties
+        # used, e.g. in a template. Full records can be several megabytes for
+        # papers of large collaborations.
+        if paper_properties is None:
+            self.paper_fields = None
+        else:
+            self.paper_fields = ",".join(Paper.fields(paper_properties))
+
+    @staticmethod
+    def paper_identifier_type(identifier_value: str) -> str:
+        if "." in identifier_value or "/" in identifier_value:
+            return "arxiv"
+        else:
+            return "literature"
+
+    @staticmethod
+    def _query(identifier_values: list[str]) -> str:
+        return " or ".join(
+            f"arxiv:{i}" if "." in i or "/" in i else f"control_number:{i}"
+            for i in identifier_values
+        )
+
+    @staticmethod
+    def _search_params(
+        query: str,
+        size: int,
+        page: int,
+        fields: str | None = None,
+        format: str | None = None,
+    ) -> dict:
+        params = {"q": query, "size": size, "page": page}
+        if fields:
+            params["fields"] = fields
+        if format:
+            params["format"] = format
+
+        return params
+
+    @staticmethod
+    def _requested_keys(identifier_values: list[str]) -> dict[str, list[str]]:
+        # Requested identifiers by the keys they can be matched with
+        requested = {}
+        for identifier_value in identifier_values:
+            key = re.sub(r"v\d+$", "", identifier_value)
+            requested.setdefault(key, []).append(identifier_value)
+
+        return requested
+
+    @staticmethod
+    def _match_hits(
+        hits: list[dict], requested: dict[str, list[str]], papers: dict
+    ) -> None:
+        for hit in hits:
+            metadata = hit["metadata"]
+            hit_keys = [str(metadata["control_number"])]
+            hit_keys += [i["value"] for i in metadata.get("arxiv_eprints", [])]
+
+            for key in hit_keys:
+                for identifier_value in requested.get(key, []):
+                    papers[identifier_value] = hit
+
+    @staticmethod
+    def _parse_bibtex(text: str) -> dict[str, str]:
+        entries = {}
+
+        texts = re.split(r"\n(?=@)", text.strip())
+        for text in texts:
+            texkey = re.match(r"@\w+\{([^,]+),", text.strip())
+            if texkey is not None:
+                entries[texkey.group(1)] = text.strip()
+
+        return entries
+
+
+class InspireHEP(InspireHEPBase):
+    def __init__(
+        self,
+        paper_properties: list[str] | None = None,
+        transport: Transport | None = None,
+        base_url: str | None = None,
+    ) -> None:
+        super().__init__(paper_properties, base_url)
+        self.transport = transport or get_default_transport()
+
+    def get(
+        self, identifier_type: str, identifier_value: str, fields: str | None = None
+    ) -> dict:
+        response = self.request(identifier_type, identifier_value, fields)
+        response.raise_for_status()
 
-class InspireHEP:
-    def __init__(self) -> None:
-        self.base_url = "https://inspirehep.net/api"
+        return response.json()
 
-    def get(self, identifier_type: str, identifier_value: str) -> dict:
+    def request(
+        self,
+        identifier_type: str,
+        identifier_value: str,
+        fields: str | None = None,
+        headers: dict | None = None,
+    ) -> requests.Response:
         url = f"{self.base_url}/{identifier_type}/{identifier_value}"
-        response = requests.get(url)
+        params = {"fields": fields} if fields else None
+
+        return self._get(url, params=params, headers=headers)
+
+    def search(
+        self,
+        identifier_type: str,
+        query: str,
+        size: int = 25,
+        page: int = 1,
+        fields: str | None = None,
+    ) -> dict:
+        url = f"{self.base_url}/{identifier_type}"
+        params = self._search_params(query, size, page, fields)
+        response = self._get(url, params=params)
         response.raise_for_status()
 
         return response.json()
 
     def get_paper(self, identifier_value: str) -> dict:
-        if "." in identifier_value or "/" in identifier_value:
-            return self.get("arxiv", identifier_value)
-        else:
-            return self.get("literature", identifier_value)
+        identifier_type = self.paper_identifier_type(identifier_value)
+        return self.get(identifier_type, identifier_value, self.paper_fields)
+
+    def get_papers(
+        self,
+        identifier_values: list[str],
+        chunk_size: int = 50,
+        fields: str | None = None,
+    ) -> dict[str, dict | None]:
+        """Retrieve many papers with a few literature searches.
+
+        The identifiers are searched for in chunks of `chunk_size`. Each record
+        found is mapped back to the identifier it was requested by, and the
+        identifiers not found are mapped to None. Only the record `fields` are
+        retrieved if given, by default those of the paper properties.
+        """
+        fields = fields or self.paper_fields
+        papers = {i: None for i in identifier_values}
+        requested = self._requested_keys(identifier_values)
+
+        keys = list(requested)
+        for start in range(0, len(keys), chunk_size):
+            query = self._query(keys[start : start + chunk_size])
+
+            page = 1
+            n_hits = 0
+            while True:
+                response = self.search("literature", query, chunk_size, page, fields)
+                hits = response["hits"]["hits"]
+                self._match_hits(hits, requested, papers)
+
+                n_hits += len(hits)
+                if len(hits) == 0 or n_hits >= response["hits"]["total"]:
+                    break
+
+                page += 1
+
+        return papers
+
+    def get_bibtex(
+        self, identifier_values: list[str], chunk_size: int = 50
+    ) -> dict[str, str]:
+        """Retrieve the BibTeX entries of many papers with a few searches.
+
+        Returns the entries by their texkeys, i.e. `Paper.texkey`.
+        """
+        url = f"{self.base_url}/literature"
+        entries = {}
+
+        for start in range(0, len(identifier_values), chunk_size):
+            query = self._query(identifier_values[start : start + chunk_size])
+
+            page = 1
+            while True:
+                params = self._search_params(query, chunk_size, page, format="bibtex")
+                response = self._get(url, params=params)
+                response.raise_for_status()
+
+                page_entries = self._parse_bibtex(response.text)
+                entries |= page_entries
+
+                if len(page_entries) < chunk_size:
+                    break
+
+                page += 1
+
+        return entries
 
     def get_author(self, identifier_value: str) -> dict:
         return self.get("authors", identifier_value)
 
     def get_job(self, identifier_value: str) -> dict:
         return self.get("jobs", identifier_value)
+
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        start = time.perf_counter()
+        response = self.transport.get(url, **kwargs)
+        instrumentation.emit("inspire_hep", response, start)
+
+        return response
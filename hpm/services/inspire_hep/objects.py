@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import time
 from dataclasses import asdict, dataclass, field
 
-import requests
 from typing_extensions import Literal, Self
 
+from .. import instrumentation
+from ..transport import Transport, get_default_transport
+
 
 @dataclass
 class Author:
@@ -42,6 +45,29 @@ class Author:
         return asdict(self)
 
 
+# Metadata fields of an INSPIRE literature record that each paper property is
+# parsed from. The record id, eprints and titles are always needed to match
+# records and pages.
+PAPER_FIELDS = {
+    "id": ["control_number"],
+    "url": ["control_number"],
+    "type": ["document_type"],
+    "source": [],
+    "title": ["titles"],
+    "authors": ["authors.full_name", "authors.record"],
+    "created_date": ["preprint_date"],
+    "published_place": ["publication_info.journal_title"],
+    "published_date": ["imprints.date"],
+    "eprint": ["arxiv_eprints"],
+    "citation_count": ["citation_count"],
+    "abstract": ["abstracts"],
+    "doi": ["dois"],
+    "texkey": ["texkeys"],
+    "bibtex": ["texkeys"],
+}
+REQUIRED_PAPER_FIELDS = ["control_number", "arxiv_eprints", "titles"]
+
+
 @dataclass
 class Paper:
     id: str | None = None
@@ -57,26 +83,43 @@ class Paper:
     citation_count: int | None = None
     abstract: str | None = None
     doi: str | None = None
+    texkey: str | None = None
     bibtex: str | None = None
+    bibtex_link: str | None = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def fields(cls, properties: list[str]) -> list[str]:
+        """Return the record fields needed to parse the given paper properties.
+
+        Properties are named as in the template, e.g. `authors.name`.
+        """
+        fields = list(REQUIRED_PAPER_FIELDS)
+        for property in properties:
+            for field_name in PAPER_FIELDS[property.split(".")[0]]:
+                if field_name not in fields:
+                    fields.append(field_name)
+
+        return fields
 
     @classmethod
     def from_response(cls, data: dict) -> Self:
+        # Only some fields may have been requested, see `Paper.fields`
         metadata = data["metadata"]
 
         paper = cls()
         paper.id = str(metadata["control_number"])
         paper.url = f"https://inspirehep.net/literature/{paper.id}"
-        paper.type = metadata["document_type"][0]
+        paper.type = metadata.get("document_type", [None])[0]
         paper.title = metadata["titles"][0]["title"]
 
-        for author_info in metadata["authors"][:10]:
+        for author_info in metadata.get("authors", [])[:10]:
             author = Author()
             author.id = author_info["record"]["$ref"].split("/")[-1]
             author.url = f"https://inspirehep.net/authors/{author.id}"
             author.name = " ".join(author_info["full_name"].split(", ")[::-1])
             paper.authors.append(author)
 
-        if metadata["preprint_date"].count("-") == 2:
+        if metadata.get("preprint_date", "").count("-") == 2:
             paper.created_date = metadata["preprint_date"]
         else:
             paper.created_date = data["created"].split("T")[0]
@@ -88,16 +131,27 @@ class Paper:
             paper.published_date = metadata["imprints"][0]["date"]
 
         paper.eprint = metadata["arxiv_eprints"][0]["value"]
-        paper.citation_count = metadata["citation_count"]
-        paper.abstract = metadata["abstracts"][0]["value"]
+        paper.citation_count = metadata.get("citation_count")
+        paper.abstract = metadata.get("abstracts", [{}])[0].get("value")
         paper.doi = metadata.get("dois", [{}])[0].get("value")
+        paper.texkey = metadata.get("texkeys", [None])[0]
 
-        bibtex_link = data["links"]["bibtex"]
-        bibtex_response = requests.get(bibtex_link)
-        paper.bibtex = bibtex_response.text[:-1]
+        # BibTeX is fetched on demand, see `load_bibtex`
+        paper.bibtex_link = data["links"]["bibtex"]
 
         return paper
 
+    def load_bibtex(self, transport: Transport | None = None) -> str | None:
+        if self.bibtex is None and self.bibtex_link is not None:
+            transport = transport or get_default_transport()
+            start = time.perf_counter()
+            response = transport.get(self.bibtex_link)
+            instrumentation.emit("inspire_hep", response, start)
+            response.raise_for_status()
+            self.bibtex = response.text.strip()
+
+        return self.bibtex
+
     @classmethod
     def from_cache(cls, data: dict) -> Self:
         authors = [Author.from_cache(a) for a in data.pop("authors")]
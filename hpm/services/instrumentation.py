@@ -0,0 +1,90 @@
+"""Hooks observing the requests sent by the service clients.
+
+The clients report each request they send with `emit`, which costs nothing
+until a hook is added:
+
+    events = []
+    add_hook(events.append)
+
+Notion reports a request once it is done retrying, so its latency includes the
+time spent waiting for the rate limit.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from urllib.parse import parse_qs, urlsplit
+
+
+@dataclass(slots=True)
+class RequestEvent:
+    service: str
+    method: str
+    endpoint: str
+    status: int
+    start: float
+    latency: float
+    retries: int
+    bytes_sent: int
+    bytes_received: int
+    thread_id: int
+
+
+_hooks: list[Callable[[RequestEvent], None]] = []
+
+
+def add_hook(hook: Callable[[RequestEvent], None]) -> None:
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[RequestEvent], None]) -> None:
+    _hooks.remove(hook)
+
+
+def emit(service: str, response, start: float, retries: int = 0) -> None:
+    """Report the response of a request started at `start`, a
+    `time.perf_counter()`, to the hooks.
+
+    Works for both the responses of requests and httpx.
+    """
+    if not _hooks:
+        return
+
+    request = response.request
+    body = request.body if hasattr(request, "body") else request.content
+    if isinstance(body, str):
+        body = body.encode()
+
+    event = RequestEvent(
+        service=service,
+        method=request.method,
+        endpoint=endpoint(str(response.url)),
+        status=response.status_code,
+        start=start,
+        latency=time.perf_counter() - start,
+        retries=retries,
+        bytes_sent=len(body or b""),
+        bytes_received=len(response.content),
+        thread_id=threading.get_ident(),
+    )
+    for hook in list(_hooks):
+        hook(event)
+
+
+def endpoint(url: str) -> str:
+    """The path of a url with its ids replaced, e.g. `/v1/pages/{id}`.
+
+    BibTeX downloads are told apart from the records by their format.
+    """
+    url = urlsplit(url)
+    path = re.sub(r"/([0-9a-f-]{32,36}|[\d.]+(v\d+)?)(?=/|$)", "/{id}", url.path)
+
+    format = parse_qs(url.query).get("format")
+    if format is not None and format[0] != "json":
+        path += f"?format={format[0]}"
+
+    return path
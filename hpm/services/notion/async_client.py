@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+
+try:
+    import httpx
+except ImportError as error:
+    raise ImportError(
+        "The async clients need httpx: pip install 'hep-paper-manager[async]'"
+    ) from error
+
+from .. import instrumentation
+from ..typecheck import typechecked
+from .client import NotionBase
+from .objects.database_properties import DatabaseProperty
+from .objects.page_properties import PageProperty
+from .rate_limiter import RateLimiter
+
+
+@typechecked
+class AsyncNotion(NotionBase):
+    """The asyncio version of `Notion`, with the same methods as coroutines.
+
+    All requests share one `httpx.AsyncClient`, so many of them can be in flight
+    at once on a single thread. Close it with `aclose` or use `async with`.
+    """
+
+    def __init__(
+        self,
+        token: str | None = None,
+        client: httpx.AsyncClient | None = None,
+        rate_limiter: RateLimiter | None = None,
+        base_url: str | None = None,
+    ) -> None:
+        super().__init__(token, rate_limiter, base_url)
+        self.client = client or httpx.AsyncClient()
+
+    async def __aenter__(self) -> AsyncNotion:
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        body: dict | None = None,
+        retry_server_errors: bool = True,
+    ) -> httpx.Response:
+        """See `Notion.request`."""
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire_async()
+            response = await self.client.request(
+                method, url, json=body, headers=self.headers
+            )
+
+            delay = self.rate_limiter.retry_delay(
+                response, attempt, retry_server_errors
+            )
+            if delay is None:
+                instrumentation.emit("notion", response, start, attempt)
+                return response
+
+            await self.rate_limiter.wait_async(delay)
+            attempt += 1
+
+    async def create_page(
+        self, parent_id: str, properties: dict[str, PageProperty]
+    ) -> dict:
+        url = f"{self.base_url}/pages"
+        body = self._create_page_body(parent_id, properties)
+        response = await self.request("POST", url, body, retry_server_errors=False)
+
+        return self._check(response, "create page")
+
+    async def retrieve_page(self, id: str) -> dict:
+        url = f"{self.base_url}/pages/{id}"
+        response = await self.request("GET", url)
+
+        return self._check(response, "retrieve page")
+
+    async def update_page(self, id: str, properties: dict[str, PageProperty]) -> dict:
+        url = f"{self.base_url}/pages/{id}"
+        body = self._update_page_body(properties)
+        response = await self.request("PATCH", url, body)
+
+        return self._check(response, "update page")
+
+    async def archive_page(self, id: str) -> None:
+        url = f"{self.base_url}/pages/{id}"
+        body = {"archived": True}
+        response = await self.request("PATCH", url, body)
+
+        self._check(response, "archive page")
+
+    async def query_database(
+        self,
+        id: str,
+        start_cursor: str | None = None,
+        page_size: int = 100,
+        filter: dict | None = None,
+        sorts: list[dict] | None = None,
+    ) -> dict:
+        url = f"{self.base_url}/databases/{id}/query"
+        body = self._query_database_body(start_cursor, page_size, filter, sorts)
+        response = await self.request("POST", url, body)
+
+        return self._check(response, "query database")
+
+    async def iter_database(
+        self,
+        id: str,
+        page_size: int = 100,
+        filter: dict | None = None,
+        sorts: list[dict] | None = None,
+    ) -> AsyncIterator[dict]:
+        """See `Notion.iter_database`."""
+        task = asyncio.create_task(
+            self.query_database(id, None, page_size, filter, sorts)
+        )
+
+        try:
+            while task is not None:
+                response = await task
+
+                task = None
+                if response["has_more"]:
+                    task = asyncio.create_task(
+                        self.query_database(
+                            id, response["next_cursor"], page_size, filter, sorts
+                        )
+                    )
+
+                for result in response["results"]:
+                    yield result
+        finally:
+            if task is not None:
+                task.cancel()
+
+    async def retrieve_database(self, id: str) -> dict:
+        url = f"{self.base_url}/databases/{id}"
+        response = await self.request("GET", url)
+
+        return self._check(response, "retrieve database")
+
+    async def search_database(self, title: str | None = None) -> dict:
+        url = f"{self.base_url}/search"
+        body = self._search_database_body(title)
+        response = await self.request("POST", url, body)
+
+        return self._check(response, "search database")
+
+    async def create_database(
+        self,
+        parent_id: str,
+        title: str,
+        properties: dict[str, DatabaseProperty],
+    ) -> dict:
+        url = f"{self.base_url}/databases"
+        body = self._create_database_body(parent_id, title, properties)
+        response = await self.request("POST", url, body, retry_server_errors=False)
+
+        return self._check(response, "create database")
+
+    async def archive_database(self, id: str) -> None:
+        url = f"{self.base_url}/databases/{id}"
+        body = {"archived": True}
+        response = await self.request("PATCH", url, body)
+
+        self._check(response, "archive database")
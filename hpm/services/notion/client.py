@@ -1,123 +1,260 @@
 from __future__ import annotations
 
 import os
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
-from typeguard import typechecked
-
+from .. import instrumentation
+from ..transport import Transport, get_default_transport
+from ..typecheck import typechecked
 from .objects.database_properties import DatabaseProperty
 from .objects.page_properties import PageProperty
+from .rate_limiter import RateLimiter
 
 
-@typechecked
-class Notion:
-    def __init__(self, token: str | None = None) -> None:
-        self.base_url = "https://api.notion.com/v1"
+class NotionError(ValueError):
+    """A request rejected by Notion, with the status and error code of the
+    response, e.g. 400 and `validation_error`."""
+
+    def __init__(self, message: str, status: int, code: str | None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+class NotionBase:
+    """The settings and request bodies shared by `Notion` and `AsyncNotion`."""
+
+    def __init__(
+        self,
+        token: str | None = None,
+        rate_limiter: RateLimiter | None = None,
+        base_url: str | None = None,
+    ) -> None:
+        self.base_url = base_url or os.getenv(
+            "HPM_NOTION_BASE_URL", "https://api.notion.com/v1"
+        )
         self.token = token or os.getenv("NOTION_ACCESS_TOKEN_FOR_HPM")
         self.headers = {
             "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json",
             "Notion-Version": "2022-06-28",
         }
+        self.rate_limiter = rate_limiter or RateLimiter()
 
-    def create_page(self, parent_id: str, properties: dict[str, PageProperty]) -> dict:
-        url = f"{self.base_url}/pages"
-        body = {
+    @staticmethod
+    def _create_page_body(parent_id: str, properties: dict[str, PageProperty]) -> dict:
+        return {
             "parent": {"database_id": parent_id},
             "properties": {k: v.as_dict() for k, v in properties.items()},
         }
-        response = requests.post(url, json=body, headers=self.headers)
 
+    @staticmethod
+    def _update_page_body(properties: dict[str, PageProperty]) -> dict:
+        return {"properties": {k: v.as_dict() for k, v in properties.items()}}
+
+    @staticmethod
+    def _query_database_body(
+        start_cursor: str | None,
+        page_size: int,
+        filter: dict | None,
+        sorts: list[dict] | None,
+    ) -> dict:
+        body = {"page_size": page_size}
+
+        if start_cursor:
+            body["start_cursor"] = start_cursor
+
+        if filter:
+            body["filter"] = filter
+
+        if sorts:
+            body["sorts"] = sorts
+
+        return body
+
+    @staticmethod
+    def _search_database_body(title: str | None) -> dict:
+        return {
+            "query": title or "",
+            "filter": {
+                "value": "database",
+                "property": "object",
+            },
+            "sort": {
+                "direction": "ascending",
+                "timestamp": "last_edited_time",
+            },
+        }
+
+    @staticmethod
+    def _create_database_body(
+        parent_id: str, title: str, properties: dict[str, DatabaseProperty]
+    ) -> dict:
+        return {
+            "parent": {"type": "page_id", "page_id": parent_id},
+            "title": [{"type": "text", "text": {"content": title, "link": None}}],
+            "properties": {name: prop.as_dict() for name, prop in properties.items()},
+        }
+
+    @staticmethod
+    def _check(response, action: str) -> dict:
+        # Works for both the responses of requests and httpx
         if response.status_code != 200:
-            raise ValueError(f"Failed to create page: {response.json()}")
+            data = response.json()
+            raise NotionError(
+                f"Failed to {action}: {data}", response.status_code, data.get("code")
+            )
 
         return response.json()
 
+
+@typechecked
+class Notion(NotionBase):
+    def __init__(
+        self,
+        token: str | None = None,
+        transport: Transport | None = None,
+        rate_limiter: RateLimiter | None = None,
+        base_url: str | None = None,
+    ) -> None:
+        super().__init__(token, rate_limiter, base_url)
+        self.transport = transport or get_default_transport()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: dict | None = None,
+        retry_server_errors: bool = True,
+    ):
+        """Send a request within the rate limit, retrying it if rate limited or
+        failed on the server side.
+
+        Creating a page or a database may have succeeded even if the server
+        failed to respond, so those requests are sent again only if rate
+        limited, see `retry_server_errors`.
+        """
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            response = self.transport.request(
+                method, url, json=body, headers=self.headers
+            )
+
+            delay = self.rate_limiter.retry_delay(
+                response, attempt, retry_server_errors
+            )
+            if delay is None:
+                instrumentation.emit("notion", response, start, attempt)
+                return response
+
+            self.rate_limiter.wait(delay)
+            attempt += 1
+
+    def create_page(self, parent_id: str, properties: dict[str, PageProperty]) -> dict:
+        url = f"{self.base_url}/pages"
+        body = self._create_page_body(parent_id, properties)
+        response = self.request("POST", url, body, retry_server_errors=False)
+
+        return self._check(response, "create page")
+
     def retrieve_page(self, id: str) -> dict:
         url = f"{self.base_url}/pages/{id}"
-        response = requests.get(url, headers=self.headers)
+        response = self.request("GET", url)
 
-        if response.status_code != 200:
-            raise ValueError(f"Failed to retrieve page: {response.json()}")
-
-        return response.json()
+        return self._check(response, "retrieve page")
 
     def update_page(self, id: str, properties: dict[str, PageProperty]) -> dict:
         url = f"{self.base_url}/pages/{id}"
-        body = {"properties": {k: v.as_dict() for k, v in properties.items()}}
-        response = requests.patch(url, json=body, headers=self.headers)
-
-        if response.status_code != 200:
-            raise ValueError(f"Failed to update page: {response.json()}")
+        body = self._update_page_body(properties)
+        response = self.request("PATCH", url, body)
 
-        return response.json()
+        return self._check(response, "update page")
 
     def archive_page(self, id: str) -> None:
         url = f"{self.base_url}/pages/{id}"
         body = {"archived": True}
-        response = requests.patch(url, json=body, headers=self.headers)
+        response = self.request("PATCH", url, body)
 
-        if response.status_code != 200:
-            raise ValueError(f"Failed to archive page: {response.json()}")
+        self._check(response, "archive page")
 
     def query_database(
-        self, id: str, start_cursor: str | None = None, page_size: int = 100
+        self,
+        id: str,
+        start_cursor: str | None = None,
+        page_size: int = 100,
+        filter: dict | None = None,
+        sorts: list[dict] | None = None,
     ) -> dict:
         url = f"{self.base_url}/databases/{id}/query"
-        body = {"page_size": page_size}
-
-        if start_cursor:
-            body["start_cursor"] = start_cursor
+        body = self._query_database_body(start_cursor, page_size, filter, sorts)
+        response = self.request("POST", url, body)
 
-        response = requests.post(url, json=body, headers=self.headers)
+        return self._check(response, "query database")
 
-        if response.status_code != 200:
-            raise ValueError(f"Failed to query database: {response.json()}")
-
-        return response.json()
-
-        # while True:
-        #     response = requests.post(url, json=payload, headers=self.headers)
-
-        #     if response.status_code != 200:
-        #         raise ValueError(f"Failed to query database: {response.json()}")
-
-        #     data = response.json()
-        #     yield data
-
-        #     if not data["has_more"]:
-        #         break
-
-        #     payload["start_cursor"] = data["next_cursor"]
+    def iter_database(
+        self,
+        id: str,
+        page_size: int = 100,
+        filter: dict | None = None,
+        sorts: list[dict] | None = None,
+    ) -> Iterator[dict]:
+        """Iterate over the pages of a database, across all batches.
+
+        The next batch is queried in the background while the current one is
+        processed, so the caller never waits for more than one round trip.
+        """
+        for _, results in self.iter_database_batches(id, page_size, filter, sorts):
+            yield from results
+
+    def iter_database_batches(
+        self,
+        id: str,
+        page_size: int = 100,
+        filter: dict | None = None,
+        sorts: list[dict] | None = None,
+        start_cursor: str | None = None,
+    ) -> Iterator[tuple[str | None, list[dict]]]:
+        """Iterate over the batches of pages of a database like `iter_database`,
+        with the cursors they start at, to continue from one later on."""
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            cursor = start_cursor
+            future = executor.submit(
+                self.query_database, id, cursor, page_size, filter, sorts
+            )
+
+            while future is not None:
+                response = future.result()
+
+                future = None
+                if response["has_more"]:
+                    future = executor.submit(
+                        self.query_database,
+                        id,
+                        response["next_cursor"],
+                        page_size,
+                        filter,
+                        sorts,
+                    )
+
+                yield cursor, response["results"]
+                cursor = response["next_cursor"]
 
     def retrieve_database(self, id: str) -> dict:
         url = f"{self.base_url}/databases/{id}"
-        response = requests.get(url, headers=self.headers)
+        response = self.request("GET", url)
 
-        if response.status_code != 200:
-            raise ValueError(f"Failed to retrieve database: {response.json()}")
-
-        return response.json()
+        return self._check(response, "retrieve database")
 
     def search_database(self, title: str | None = None) -> dict:
         url = f"{self.base_url}/search"
-        body = {
-            "query": title or "",
-            "filter": {
-                "value": "database",
-                "property": "object",
-            },
-            "sort": {
-                "direction": "ascending",
-                "timestamp": "last_edited_time",
-            },
-        }
-        response = requests.post(url, json=body, headers=self.headers)
+        body = self._search_database_body(title)
+        response = self.request("POST", url, body)
 
-        if response.status_code != 200:
-            raise ValueError(f"Failed to search database: {response.json()}")
-
-        return response.json()
+        return self._check(response, "search database")
 
     def create_database(
         self,
@@ -126,22 +263,14 @@ class Notion:
         properties: dict[str, DatabaseProperty],
     ) -> dict:
         url = f"{self.base_url}/databases"
-        body = {
-            "parent": {"type": "page_id", "page_id": parent_id},
-            "title": [{"type": "text", "text": {"content": title, "link": None}}],
-            "properties": {name: prop.as_dict() for name, prop in properties.items()},
-        }
-        response = requests.post(url, json=body, headers=self.headers)
+        body = self._create_database_body(parent_id, title, properties)
+        response = self.request("POST", url, body, retry_server_errors=False)
 
-        if response.status_code != 200:
-            raise ValueError(f"Failed to create database: {response.json()}")
-
-        return response.json()
+        return self._check(response, "create database")
 
     def archive_database(self, id: str) -> None:
         url = f"{self.base_url}/databases/{id}"
         body = {"archived": True}
-        response = requests.patch(url, json=body, headers=self.headers)
+        response = self.request("PATCH", url, body)
 
-        if response.status_code != 200:
-            raise ValueError(f"Failed to archive database: {response.json()}")
+        self._check(response, "archive database")
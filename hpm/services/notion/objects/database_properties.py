@@ -3,17 +3,28 @@ from typing import Any, Literal, Self
 from pydantic.dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True)
 class DatabaseProperty:
+    """A database property, see `PageProperty` for `from_trusted`."""
+
     value: Any = None
     id: str | None = None
 
     @classmethod
     def from_dict(cls, data: dict) -> Self:
-        return cls(id=data["id"])
+        return cls.from_trusted(None, data["id"])
+
+    @classmethod
+    def from_trusted(cls, value: Any, id: str | None = None) -> Self:
+        prop = object.__new__(cls)
+        prop.value = value
+        prop.id = id
+        prop.type = cls.__dataclass_fields__["type"].default
+
+        return prop
 
 
-@dataclass
+@dataclass(slots=True)
 class Date(DatabaseProperty):
     type: Literal["date"] = "date"
 
@@ -21,7 +32,7 @@ class Date(DatabaseProperty):
         return {"date": {}}
 
 
-@dataclass
+@dataclass(slots=True)
 class MultiSelect(DatabaseProperty):
     type: Literal["multi_select"] = "multi_select"
 
@@ -29,7 +40,7 @@ class MultiSelect(DatabaseProperty):
         return {"multi_select": {}}
 
 
-@dataclass
+@dataclass(slots=True)
 class Number(DatabaseProperty):
     type: Literal["number"] = "number"
 
@@ -37,14 +48,14 @@ class Number(DatabaseProperty):
         return {"number": {}}
 
 
-@dataclass
+@dataclass(slots=True)
 class Relation(DatabaseProperty):
     type: Literal["relation"] = "relation"
 
     @classmethod
     def from_dict(cls, data: dict):
-        return cls(
-            value=data["relation"]["database_id"].replace("-", ""), id=data["id"]
+        return cls.from_trusted(
+            data["relation"]["database_id"].replace("-", ""), data["id"]
         )
 
     def as_dict(self):
@@ -54,7 +65,7 @@ class Relation(DatabaseProperty):
         return {"relation": {"database_id": self.value, "single_property": {}}}
 
 
-@dataclass
+@dataclass(slots=True)
 class RichText(DatabaseProperty):
     type: Literal["rich_text"] = "rich_text"
 
@@ -62,7 +73,7 @@ class RichText(DatabaseProperty):
         return {"rich_text": {}}
 
 
-@dataclass
+@dataclass(slots=True)
 class Select(DatabaseProperty):
     type: Literal["select"] = "select"
 
@@ -70,7 +81,7 @@ class Select(DatabaseProperty):
         return {"select": {}}
 
 
-@dataclass
+@dataclass(slots=True)
 class Title(DatabaseProperty):
     type: Literal["title"] = "title"
 
@@ -78,7 +89,7 @@ class Title(DatabaseProperty):
         return {"title": {}}
 
 
-@dataclass
+@dataclass(slots=True)
 class URL(DatabaseProperty):
     type: Literal["url"] = "url"
 
@@ -35,7 +35,7 @@ class Page:
             title=data["title"],
             url=data["url"],
             properties={
-                k: ALL_PAGE_PROPERTIES[v["type"]](value=v["value"], id=v["id"])
+                k: ALL_PAGE_PROPERTIES[v["type"]].from_trusted(v["value"], v["id"])
                 for k, v in data["properties"].items()
             },
         )
@@ -45,5 +45,8 @@ class Page:
             "id": self.id,
             "url": self.url,
             "title": self.title,
-            "properties": {k: v.as_dict() for k, v in self.properties.items()},
+            "properties": {
+                k: {"id": v.id, "type": v.type, "value": v.value}
+                for k, v in self.properties.items()
+            },
         }
@@ -4,71 +4,82 @@ from typing import Any, Literal, Self
 from pydantic.dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True)
 class PageProperty:
+    """A page property, validated on construction.
+
+    Properties parsed from Notion responses, of which a large database has tens
+    of thousands, are built with `from_trusted` instead to skip the validation.
+    """
+
     value: Any = None
     id: str | None = None
 
+    @classmethod
+    def from_trusted(cls, value: Any, id: str | None = None) -> Self:
+        prop = object.__new__(cls)
+        prop.value = value
+        prop.id = id
+        prop.type = cls.__dataclass_fields__["type"].default
+
+        return prop
+
 
-@dataclass
+@dataclass(slots=True)
 class Date(PageProperty):
     value: str | None = None
     type: Literal["date"] = "date"
 
     @classmethod
     def from_dict(cls, data: dict) -> Self:
-        return cls(
-            value=data["date"]["start"] if data["date"] else None,
-            id=data["id"],
+        return cls.from_trusted(
+            data["date"]["start"] if data["date"] else None, data["id"]
         )
 
     def as_dict(self) -> dict:
         return {"date": {"start": self.value} if self.value else None}
 
 
-@dataclass
+@dataclass(slots=True)
 class MultiSelect(PageProperty):
     value: list[str] = field(default_factory=list)
     type: Literal["multi_select"] = "multi_select"
 
     @classmethod
     def from_dict(cls, data: dict) -> Self:
-        return cls(
-            value=[i["name"] for i in data["multi_select"]],
-            id=data["id"],
-        )
+        return cls.from_trusted([i["name"] for i in data["multi_select"]], data["id"])
 
     def as_dict(self) -> dict:
         return {"multi_select": [{"name": i} for i in self.value]}
 
 
-@dataclass
+@dataclass(slots=True)
 class Number(PageProperty):
     value: int | float | None = None
     type: Literal["number"] = "number"
 
     @classmethod
     def from_dict(cls, data: dict) -> Self:
-        return cls(value=data["number"], id=data["id"])
+        return cls.from_trusted(data["number"], data["id"])
 
     def as_dict(self) -> dict:
         return {"number": self.value}
 
 
-@dataclass
+@dataclass(slots=True)
 class Relation(PageProperty):
     value: list[str] = field(default_factory=list)
     type: Literal["relation"] = "relation"
 
     @classmethod
     def from_dict(cls, data: dict) -> Self:
-        return cls(value=[i["id"] for i in data["relation"]], id=data["id"])
+        return cls.from_trusted([i["id"] for i in data["relation"]], data["id"])
 
     def as_dict(self) -> dict:
         return {"relation": [{"id": i} for i in self.value]}
 
 
-@dataclass
+@dataclass(slots=True)
 class RichText(PageProperty):
     value: str | None = None
     type: Literal["rich_text"] = "rich_text"
@@ -76,7 +87,7 @@ class RichText(PageProperty):
     @classmethod
     def from_dict(cls, property_value: dict) -> Self:
         value = "".join(i["text"]["content"] for i in property_value["rich_text"])
-        return cls(value=value or None, id=property_value["id"])
+        return cls.from_trusted(value or None, property_value["id"])
 
     def as_dict(self) -> dict:
         if self.value is None:
@@ -90,16 +101,15 @@ class RichText(PageProperty):
         return {"rich_text": [{"type": "text", "text": {"content": value}}]}
 
 
-@dataclass
+@dataclass(slots=True)
 class Select(PageProperty):
     value: str | None = None
     type: Literal["select"] = "select"
 
     @classmethod
     def from_dict(cls, data: dict) -> Self:
-        return cls(
-            value=data["select"]["name"] if data["select"] else None,
-            id=data["id"],
+        return cls.from_trusted(
+            data["select"]["name"] if data["select"] else None, data["id"]
         )
 
     def as_dict(self) -> dict:
@@ -109,7 +119,7 @@ class Select(PageProperty):
         return {"select": {"name": self.value}}
 
 
-@dataclass
+@dataclass(slots=True)
 class Title(PageProperty):
     value: str | None = None
     type: Literal["title"] = "title"
@@ -117,7 +127,7 @@ class Title(PageProperty):
     @classmethod
     def from_dict(cls, property_value: dict) -> Self:
         value = "".join(i["text"]["content"] for i in property_value["title"])
-        return cls(value=value or None, id=property_value["id"])
+        return cls.from_trusted(value or None, property_value["id"])
 
     def as_dict(self) -> dict:
         if self.value is None:
@@ -126,14 +136,14 @@ class Title(PageProperty):
         return {"title": [{"type": "text", "text": {"content": self.value}}]}
 
 
-@dataclass
+@dataclass(slots=True)
 class URL(PageProperty):
     value: str | None = None
     type: Literal["url"] = "url"
 
     @classmethod
     def from_dict(cls, data: dict) -> Self:
-        return cls(value=data["url"], id=data["id"])
+        return cls.from_trusted(data["url"], data["id"])
 
     def as_dict(self) -> dict:
         return {"url": self.value}
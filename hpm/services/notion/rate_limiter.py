@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+
+# Status codes of requests worth sending again
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """A token bucket keeping the requests to Notion within its rate limit.
+
+    Notion allows an average of 3 requests per second per integration. Each
+    request takes a token from the bucket, which refills at `rate` tokens per
+    second up to `burst` tokens. When it is empty, requests wait for their turn
+    in the order they arrived.
+
+    Rate limited (429) and failed (5xx) requests are retried up to `max_retries`
+    times, after the `Retry-After` of the response or else an exponential
+    backoff with full jitter. A 429 also pauses all other requests.
+
+    It is thread-safe, and shared by the threads of a `Notion` client or the
+    tasks of an `AsyncNotion` client.
+    """
+
+    def __init__(
+        self,
+        rate: float = 3,
+        burst: int = 3,
+        max_retries: int = 5,
+        backoff: float = 1,
+        max_backoff: float = 60,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        # Tokens go negative when requests are waiting for them. The bucket
+        # refills from `_updated_at`, which is in the future while paused.
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.queue_depth = 0
+        self.wait_time = 0.0
+        self.n_requests = 0
+        self.n_retries = 0
+
+    def reserve(self) -> float:
+        """Take a token and return the seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            if now > self._updated_at:
+                elapsed = now - self._updated_at
+                self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+                self._updated_at = now
+
+            self._tokens -= 1
+            delay = self._updated_at - now + max(0, -self._tokens / self.rate)
+
+            self.n_requests += 1
+            self.wait_time += delay
+
+            return delay
+
+    def acquire(self) -> None:
+        self.wait(self.reserve())
+
+    async def acquire_async(self) -> None:
+        await self.wait_async(self.reserve())
+
+    def retry_delay(
+        self, response, attempt: int, retry_server_errors: bool = True
+    ) -> float | None:
+        """Return the seconds to wait before retrying a request, or None if it
+        should not be retried.
+
+        `attempt` counts the retries already done, starting from 0. Requests
+        that are not idempotent may have taken effect despite a server error,
+        so they should only be retried if rate limited, see
+        `retry_server_errors`.
+        """
+        if response.status_code not in RETRY_STATUS_CODES:
+            return None
+
+        if response.status_code != 429 and not retry_server_errors:
+            return None
+
+        if attempt >= self.max_retries:
+            return None
+
+        delay = self._retry_after(response)
+        if delay is None:
+            backoff = min(self.max_backoff, self.backoff * 2**attempt)
+            delay = random.uniform(0, backoff)
+
+        with self._lock:
+            self.n_retries += 1
+            self.wait_time += delay
+
+            # Being rate limited means the other requests are too. They are
+            # sent one by one once the pause is over, rather than all at once.
+            if response.status_code == 429:
+                paused_until = time.monotonic() + delay
+                if paused_until > self._updated_at:
+                    self._tokens = min(self._tokens, 1)
+                    self._updated_at = paused_until
+
+        return delay
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.n_requests,
+            "retries": self.n_retries,
+            "queue_depth": self.queue_depth,
+            "wait_time": self.wait_time,
+        }
+
+    def wait(self, delay: float) -> None:
+        if delay <= 0:
+            return
+
+        with self._lock:
+            self.queue_depth += 1
+        try:
+            time.sleep(delay)
+        finally:
+            with self._lock:
+                self.queue_depth -= 1
+
+    async def wait_async(self, delay: float) -> None:
+        if delay <= 0:
+            return
+
+        with self._lock:
+            self.queue_depth += 1
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            with self._lock:
+                self.queue_depth -= 1
+
+    @staticmethod
+    def _retry_after(response) -> float | None:
+        # Notion sends the seconds to wait, not an HTTP date
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+
+        try:
+            return max(0, float(value))
+        except ValueError:
+            return None
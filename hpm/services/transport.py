@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class Transport:
+    """Pooled keep-alive HTTP sessions, one per host, shared by the clients.
+
+    Connections to a host are reused across requests, so only the first request
+    to api.notion.com or inspirehep.net pays for the TCP and TLS handshakes.
+    `pool_maxsize` bounds the connections kept open to each host and should be
+    at least the number of threads sending requests at once.
+    """
+
+    def __init__(
+        self,
+        pool_maxsize: int = 10,
+        connect_timeout: float = 10,
+        read_timeout: float = 60,
+        gzip: bool = True,
+    ) -> None:
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+        self.gzip = gzip
+
+        self.sessions: dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def session(self, url: str) -> requests.Session:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self.sessions:
+                self.sessions[host] = self._create_session()
+
+            return self.sessions[host]
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session(url).request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PATCH", url, **kwargs)
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self.sessions.values():
+                session.close()
+
+            self.sessions = {}
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        session.headers["Accept-Encoding"] = (
+            "gzip, deflate" if self.gzip else "identity"
+        )
+
+        # Each session talks to a single host, so one pool is enough
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        return session
+
+
+_default_transport = None
+_default_transport_lock = threading.Lock()
+
+
+def get_default_transport() -> Transport:
+    """The transport of clients created without one, shared process-wide."""
+    global _default_transport
+
+    with _default_transport_lock:
+        if _default_transport is None:
+            _default_transport = Transport()
+
+        return _default_transport
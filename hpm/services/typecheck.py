@@ -0,0 +1,20 @@
+import os
+
+
+def is_enabled() -> bool:
+    return os.getenv("HPM_TYPECHECK", "").lower() in ("1", "true", "yes")
+
+
+def typechecked(target):
+    """Check the argument and return types of a class or function at runtime,
+    like `typeguard.typechecked`, but only if `HPM_TYPECHECK` is set.
+
+    The checks are a debug mode, as they cost every call a deep inspection of
+    its arguments, e.g. of each property of a page to update.
+    """
+    if not is_enabled():
+        return target
+
+    import typeguard
+
+    return typeguard.typechecked(target)
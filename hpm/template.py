@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass, fields, replace
+from operator import attrgetter
+from typing import TYPE_CHECKING, Any
+
+from .services.inspire_hep.objects import PAPER_FIELDS, Author, Paper
+from .services.notion.objects.page import Page
+from .services.notion.objects.page_properties import ALL_PAGE_PROPERTIES, PageProperty
+
+if TYPE_CHECKING:
+    from .services.transport import Transport
+
+
+class TemplateError(ValueError):
+    """A template not matching the papers or the database."""
+
+
+@dataclass(frozen=True, slots=True)
+class Mapping:
+    paper_property: str
+    page_property: str
+    get: Callable[[Paper], Any]
+    page_property_cls: type[PageProperty] | None = None
+
+
+class Template:
+    """A template compiled into the mappings from paper to page properties.
+
+    The template is interpreted once, so that adding or updating many papers
+    only calls the precomputed getters of the paper values. Once bound to the
+    types of the database properties with `bind`, it also knows the classes of
+    the page properties and can build new pages.
+
+    BibTeX is loaded with `transport`, so that it shares the settings of the
+    command, or with the default transport if not given.
+    """
+
+    def __init__(
+        self,
+        data: dict,
+        property_types: dict[str, str] | None = None,
+        transport: Transport | None = None,
+    ):
+        self.database_id: str = data["database_id"]
+        self.properties: dict[str, str | None] = data["properties"]
+
+        self.mappings = [
+            Mapping(paper_property, page_property, _getter(paper_property, transport))
+            for paper_property, page_property in self.properties.items()
+            if page_property is not None
+        ]
+
+        if property_types is not None:
+            self.bind(property_types)
+
+    @property
+    def paper_properties(self) -> list[str]:
+        return [i.paper_property for i in self.mappings]
+
+    @property
+    def needs_bibtex(self) -> bool:
+        return self.properties.get("bibtex") is not None
+
+    def bind(self, property_types: dict[str, str]) -> None:
+        """Check the template against the types of the database properties,
+        by their names, and resolve the classes of the page properties."""
+        missing = [
+            i.page_property
+            for i in self.mappings
+            if property_types.get(i.page_property) not in ALL_PAGE_PROPERTIES
+        ]
+        if len(missing) > 0:
+            raise TemplateError(
+                f"Properties not in the database or of unsupported types: "
+                f"{', '.join(missing)}"
+            )
+
+        self.mappings = [
+            replace(
+                i,
+                page_property_cls=ALL_PAGE_PROPERTIES[property_types[i.page_property]],
+            )
+            for i in self.mappings
+        ]
+
+    def page_properties(self, paper: Paper) -> dict[str, PageProperty]:
+        """The properties of a new page for the paper, see `bind`."""
+        return {
+            i.page_property: i.page_property_cls(i.get(paper)) for i in self.mappings
+        }
+
+    def update(self, page: Page, paper: Paper) -> list[tuple]:
+        """Set the page properties that differ from the paper.
+
+        Returns the changes as (property, original value, new value).
+        """
+        changes = []
+        for mapping in self.mappings:
+            value = mapping.get(paper)
+            page_property = page.properties[mapping.page_property]
+            if page_property.value != value:
+                changes.append((mapping.page_property, page_property.value, value))
+                page_property.value = value
+
+        return changes
+
+
+def _getter(
+    paper_property: str, transport: Transport | None = None
+) -> Callable[[Paper], Any]:
+    if paper_property == "bibtex":
+        # BibTeX is only fetched when a template needs it
+        return lambda paper: paper.load_bibtex(transport)
+
+    first_level_property, _, second_level_property = paper_property.partition(".")
+    if first_level_property not in PAPER_FIELDS:
+        raise TemplateError(f"Unknown paper property: {paper_property}")
+
+    if not second_level_property:
+        return attrgetter(paper_property)
+
+    if second_level_property not in {i.name for i in fields(Author)}:
+        raise TemplateError(f"Unknown paper property: {paper_property}")
+
+    get_items = attrgetter(first_level_property)
+    get_value = attrgetter(second_level_property)
+    return lambda paper: [get_value(i) for i in get_items(paper)]
@@ -1,6 +1,8 @@
 from rich.console import Console
 from rich.theme import Theme
 
+from .profiler import phase
+
 THEME = Theme(
     {
         "sect": "bold white",  # section
@@ -22,4 +24,5 @@ console = Console(theme=THEME)
 
 
 def print(*args, **kwargs):
-    console.print(*args, **kwargs, overflow="ignore", crop=False)
+    with phase("render", "console"):
+        console.print(*args, **kwargs, overflow="ignore", crop=False)
@@ -1,5 +1,10 @@
+import os
+
 import pytest
 
+# Check the types of the client calls made by the tests
+os.environ.setdefault("HPM_TYPECHECK", "1")
+
 
 @pytest.fixture
 def TEST_PAGE_ID():
@@ -14,3 +19,26 @@ def TEST_DATABASE_ID():
 @pytest.fixture
 def TEST_PAPERS_DATABASE_ID():
     return "12d1444c50e4804cb93be067530fa954"
+
+
+@pytest.fixture
+def fake_server():
+    """A local Notion and InspireHEP server, see `fake_server.py`."""
+    from fake_server import FakeServer
+
+    with FakeServer() as server:
+        yield server
+
+
+@pytest.fixture
+def fake_app(fake_server, tmp_path, monkeypatch):
+    """`hpm` set up in a temporary home to use the fake server, with a database
+    of 3 papers. Returns their eprints and the one of a paper not added yet."""
+    from fake_server import create_app_dir
+
+    database_id, eprints = fake_server.create_papers_database(3)
+    create_app_dir(tmp_path, database_id)
+    for key, value in fake_server.environ(tmp_path).items():
+        monkeypatch.setenv(key, value)
+
+    return eprints
@@ -0,0 +1,747 @@
+"""An in-process stand-in for the Notion and InspireHEP APIs.
+
+It implements the endpoints used by `Notion` and `InspireHEP`, seeded from the
+recorded InspireHEP fixtures, so that the clients, the CLI and benchmarks can
+run deterministically without network. Point the clients at it with their
+`base_url` arguments or the `HPM_NOTION_BASE_URL` and `HPM_INSPIRE_BASE_URL`
+environment variables:
+
+    with FakeServer(latency=0.05, rate_limit=3) as server:
+        notion = Notion("token", base_url=server.notion_url)
+        inspire_hep = InspireHEP(base_url=server.inspire_url)
+
+Latency, Notion's rate limit, the page size of database queries and failures
+are configurable. Requests and bytes are counted per endpoint in `stats`.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = Path(__file__).parent / "services" / "inspire_hep"
+TEMPLATE_FILE = Path(__file__).parents[1] / "hpm" / "templates" / "paper.yml"
+
+# The properties of the database created by `hpm demo`, by their types
+PAPERS_DATABASE = {
+    "Title": "title",
+    "Authors": "multi_select",
+    "Date": "date",
+    "Published in": "select",
+    "Published": "date",
+    "ArXiv ID": "rich_text",
+    "Citations": "number",
+    "DOI": "rich_text",
+    "URL": "url",
+    "Abstract": "rich_text",
+    "BibTeX": "rich_text",
+}
+
+# Values of empty page properties by their types
+EMPTY_VALUES = {
+    "date": None,
+    "multi_select": [],
+    "number": None,
+    "relation": [],
+    "rich_text": [],
+    "select": None,
+    "title": [],
+    "url": None,
+}
+
+
+class FakeServerError(Exception):
+    def __init__(self, status: int, code: str, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+class FakeServer:
+    def __init__(
+        self,
+        latency: float = 0,
+        rate_limit: float | None = None,
+        max_page_size: int = 100,
+        error_rate: float = 0,
+        seed: int = 0,
+    ) -> None:
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.max_page_size = max_page_size
+        self.error_rate = error_rate
+
+        self.databases: dict[str, dict] = {}
+        self.pages: dict[str, dict] = {}
+        self.records: dict[str, dict[str, dict]] = {
+            "literature": {},
+            "authors": {},
+            "jobs": {},
+        }
+        self.eprints: dict[str, str] = {}
+
+        self.stats = {"requests": Counter(), "bytes_in": 0, "bytes_out": 0}
+        self.failures: deque[list] = deque()
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = float(rate_limit or 0)
+        self._updated_at = time.monotonic()
+        self._server = None
+        self._thread = None
+
+        self._load_fixtures()
+
+    # Lifecycle -------------------------------------------------------------- #
+    def start(self) -> FakeServer:
+        handler = type("Handler", (FakeRequestHandler,), {"fake": self})
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> FakeServer:
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def notion_url(self) -> str:
+        return f"{self.url}/v1"
+
+    @property
+    def inspire_url(self) -> str:
+        return f"{self.url}/api"
+
+    # Seeding ---------------------------------------------------------------- #
+    def add_paper(self, record: dict) -> None:
+        control_number = str(record["metadata"]["control_number"])
+        self.records["literature"][control_number] = record
+        for eprint in record["metadata"].get("arxiv_eprints", []):
+            self.eprints[eprint["value"]] = control_number
+
+    def generate_papers(self, n: int) -> list[str]:
+        """Add `n` papers cloned from a recorded one, returning their eprints.
+
+        The clones share the nested values of the recorded paper, so even many
+        thousands of them are cheap.
+        """
+        template = self.records["literature"]["1405106"]
+        eprints = []
+        for i in range(n):
+            eprint = f"{2001 + i // 100000}.{i % 100000:05d}"
+            control_number = 9000000 + i
+            metadata = template["metadata"] | {
+                "control_number": control_number,
+                "arxiv_eprints": [{"value": eprint, "categories": ["hep-ph"]}],
+                "titles": [{"title": f"Generated paper {i}"}],
+                "texkeys": [f"Generated:{i}"],
+                "citation_count": self._random.randint(0, 1000),
+            }
+            self.add_paper(template | {"id": str(control_number), "metadata": metadata})
+            eprints.append(eprint)
+
+        return eprints
+
+    def create_database(self, title: str, properties: dict[str, str]) -> str:
+        """Create a database with properties given by their names and types."""
+        body = {
+            "title": [{"type": "text", "text": {"content": title}}],
+            "properties": {name: {type: {}} for name, type in properties.items()},
+        }
+        with self._lock:
+            return self._create_database(body)["id"]
+
+    def create_papers_database(self, n_papers: int) -> tuple[str, list[str]]:
+        """Create a database like `hpm demo` with pages for `n_papers` papers.
+
+        The pages only have their titles and eprints, so updating them changes
+        all other properties. Returns the database id and the eprints of the
+        papers, with one more not in the database yet.
+        """
+        database_id = self.create_database("Papers", PAPERS_DATABASE)
+
+        eprints = self.generate_papers(n_papers + 1)
+        for i, eprint in enumerate(eprints[:-1]):
+            properties = {
+                "Title": {"title": _text(f"Generated paper {i}")},
+                "ArXiv ID": {"rich_text": _text(eprint)},
+            }
+            self.create_page(database_id, properties)
+
+        return database_id, eprints
+
+    def environ(self, home: Path) -> dict[str, str]:
+        """The environment variables for `hpm` to use this server, with its
+        app directory in `home`, see `create_app_dir`."""
+        return {
+            "HOME": str(home),
+            "HPM_NOTION_BASE_URL": self.notion_url,
+            "HPM_INSPIRE_BASE_URL": self.inspire_url,
+        }
+
+    def create_page(self, database_id: str, properties: dict) -> str:
+        """Create a page with properties in the format of the requests."""
+        body = {"parent": {"database_id": database_id}, "properties": properties}
+        with self._lock:
+            return self._create_page(body)["id"]
+
+    def fail(
+        self, status: int = 500, count: int = 1, path: str | None = None, after: int = 0
+    ) -> None:
+        """Make the next `count` requests, to paths starting with `path` if
+        given, fail with `status`, once `after` of them have succeeded."""
+        with self._lock:
+            self.failures.extend(
+                [status, path, after if i == 0 else 0] for i in range(count)
+            )
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats = {"requests": Counter(), "bytes_in": 0, "bytes_out": 0}
+
+    def _load_fixtures(self) -> None:
+        for file in sorted(FIXTURES_DIR.glob("*.json")):
+            kind, identifier = file.stem.split("-", 1)
+            if kind == "paper" and "." in identifier:
+                # The same record as retrieved by its arXiv id
+                continue
+
+            record = json.loads(file.read_text())
+            if kind == "paper":
+                self.add_paper(record)
+            else:
+                self.records[f"{kind}s"][identifier] = record
+
+    # Request handling ------------------------------------------------------- #
+    def handle(self, method: str, target: str, headers, body: bytes):
+        url = urlsplit(target)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        endpoint = re.sub(
+            r"/([0-9a-f-]{32,36}|[\d.]+(v\d+)?)(?=/|$)", "/{id}", url.path
+        )
+
+        with self._lock:
+            self.stats["requests"][f"{method} {endpoint}"] += 1
+            self.stats["bytes_in"] += len(body)
+
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        try:
+            self._inject_failure(url.path)
+
+            if url.path.startswith("/v1/"):
+                if not headers.get("Authorization", "").startswith("Bearer "):
+                    raise FakeServerError(401, "unauthorized", "Invalid token")
+
+                self._check_rate_limit()
+                data = json.loads(body) if body else {}
+                with self._lock:
+                    return self._handle_notion(method, url.path, data)
+
+            if url.path.startswith("/api/") and method == "GET":
+                with self._lock:
+                    return self._handle_inspire(url.path, params, headers)
+
+            raise FakeServerError(404, "not_found", f"No route for {target}")
+        except FakeServerError as e:
+            headers = {}
+            if e.status == 429:
+                headers["Retry-After"] = e.message
+            error = {"object": "error", "status": e.status, "code": e.code}
+            return e.status, headers, error | {"message": e.message}
+
+    def _inject_failure(self, path: str) -> None:
+        with self._lock:
+            for i, (status, prefix, after) in enumerate(self.failures):
+                if prefix is None or path.startswith(prefix):
+                    if after > 0:
+                        self.failures[i][2] -= 1
+                        break
+
+                    del self.failures[i]
+                    raise FakeServerError(status, "injected", "Injected failure")
+
+            if self.error_rate > 0 and self._random.random() < self.error_rate:
+                raise FakeServerError(502, "injected", "Injected failure")
+
+    def _check_rate_limit(self) -> None:
+        # A token bucket holding a second worth of requests
+        if self.rate_limit is None:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated_at
+            self._tokens = min(
+                self.rate_limit, self._tokens + elapsed * self.rate_limit
+            )
+            self._updated_at = now
+
+            if self._tokens < 1:
+                retry_after = (1 - self._tokens) / self.rate_limit
+                raise FakeServerError(429, "rate_limited", f"{retry_after:.3f}")
+
+            self._tokens -= 1
+
+    # Notion ----------------------------------------------------------------- #
+    def _handle_notion(self, method: str, path: str, data: dict):
+        parts = path.strip("/").split("/")[1:]
+
+        match method, parts:
+            case "POST", ["pages"]:
+                return 200, {}, self._create_page(data)
+            case "GET", ["pages", id]:
+                return 200, {}, self._get_page(id)
+            case "PATCH", ["pages", id]:
+                return 200, {}, self._update_page(id, data)
+            case "POST", ["databases"]:
+                return 200, {}, self._create_database(data)
+            case "GET", ["databases", id]:
+                return 200, {}, self._get_database(id)
+            case "PATCH", ["databases", id]:
+                database = self._get_database(id)
+                database["archived"] = data.get("archived", database["archived"])
+                return 200, {}, database
+            case "POST", ["databases", id, "query"]:
+                return 200, {}, self._query_database(id, data)
+            case "POST", ["search"]:
+                return 200, {}, self._search(data)
+
+        raise FakeServerError(400, "invalid_request_url", f"Invalid URL {path}")
+
+    def _create_database(self, data: dict) -> dict:
+        title = "".join(i["text"]["content"] for i in data["title"])
+        id = self._new_id()
+        now = self._now()
+
+        properties = {}
+        for name, value in data["properties"].items():
+            type = next(iter(value))
+            config = value[type]
+            if type == "relation":
+                config = {
+                    "database_id": config["database_id"],
+                    "type": "single_property",
+                    "single_property": {},
+                }
+            properties[name] = {
+                "id": self._new_id()[:4],
+                "name": name,
+                "type": type,
+                type: config,
+            }
+
+        database = {
+            "object": "database",
+            "id": id,
+            "created_time": now,
+            "last_edited_time": now,
+            "title": [
+                {"type": "text", "text": {"content": title}, "plain_text": title}
+            ],
+            "url": f"https://www.notion.so/{id.replace('-', '')}",
+            "archived": False,
+            "properties": properties,
+        }
+        self.databases[id] = database
+
+        return copy.deepcopy(database)
+
+    def _get_database(self, id: str) -> dict:
+        database = self.databases.get(self._normalize_id(id, self.databases))
+        if database is None:
+            raise FakeServerError(404, "object_not_found", f"No database {id}")
+
+        return database
+
+    def _create_page(self, data: dict) -> dict:
+        database = self._get_database(data["parent"]["database_id"])
+        id = self._new_id()
+        now = self._now()
+
+        page = {
+            "object": "page",
+            "id": id,
+            "created_time": now,
+            "last_edited_time": now,
+            "archived": False,
+            "in_trash": False,
+            "parent": {"type": "database_id", "database_id": database["id"]},
+            "url": f"https://www.notion.so/{id.replace('-', '')}",
+            "properties": {
+                name: {"id": schema["id"], "type": schema["type"]}
+                | {schema["type"]: copy.deepcopy(EMPTY_VALUES[schema["type"]])}
+                for name, schema in database["properties"].items()
+            },
+        }
+        self._set_properties(page, database, data.get("properties", {}))
+        self.pages[id] = page
+
+        return copy.deepcopy(page)
+
+    def _get_page(self, id: str) -> dict:
+        page = self.pages.get(self._normalize_id(id, self.pages))
+        if page is None:
+            raise FakeServerError(404, "object_not_found", f"No page {id}")
+
+        return copy.deepcopy(page)
+
+    def _update_page(self, id: str, data: dict) -> dict:
+        page = self.pages.get(self._normalize_id(id, self.pages))
+        if page is None:
+            raise FakeServerError(404, "object_not_found", f"No page {id}")
+
+        if page["archived"] and data.get("archived", True):
+            raise FakeServerError(
+                400,
+                "validation_error",
+                "Can't edit block that is archived. You must unarchive the block "
+                "before editing.",
+            )
+
+        database = self.databases[page["parent"]["database_id"]]
+        self._set_properties(page, database, data.get("properties", {}))
+        if "archived" in data:
+            page["archived"] = page["in_trash"] = data["archived"]
+        page["last_edited_time"] = self._now()
+
+        return copy.deepcopy(page)
+
+    def _set_properties(self, page: dict, database: dict, properties: dict) -> None:
+        for name, value in properties.items():
+            schema = database["properties"].get(name)
+            if schema is None:
+                raise FakeServerError(
+                    400, "validation_error", f"{name} is not a property that exists."
+                )
+
+            type = schema["type"]
+            if type not in value:
+                raise FakeServerError(
+                    400,
+                    "validation_error",
+                    f"{name} is expected to be {type}.",
+                )
+
+            page["properties"][name][type] = self._property_value(type, value[type])
+
+    def _property_value(self, type: str, value):
+        if type in ("title", "rich_text"):
+            items = []
+            for item in value:
+                content = item["text"]["content"]
+                if len(content) > 2000:
+                    raise FakeServerError(
+                        400,
+                        "validation_error",
+                        "Text content length should be ≤ 2000.",
+                    )
+                items.append(
+                    {
+                        "type": "text",
+                        "text": {"content": content, "link": None},
+                        "plain_text": content,
+                    }
+                )
+            return items
+
+        if type == "multi_select":
+            return [{"id": self._new_id()[:8], "name": i["name"]} for i in value]
+
+        if type == "select" and value is not None:
+            return {"id": self._new_id()[:8], "name": value["name"]}
+
+        if type == "date" and value is not None:
+            return {"start": value["start"], "end": None, "time_zone": None}
+
+        return value
+
+    def _query_database(self, id: str, data: dict) -> dict:
+        database = self._get_database(id)
+        pages = [
+            page
+            for page in self.pages.values()
+            if page["parent"]["database_id"] == database["id"]
+            and not page["archived"]
+            and self._matches(page, data.get("filter"))
+        ]
+
+        for sort in reversed(data.get("sorts", [])):
+            pages.sort(
+                key=lambda page: self._sort_key(page, sort),
+                reverse=sort.get("direction") == "descending",
+            )
+
+        page_size = min(data.get("page_size", 100), self.max_page_size)
+        start = int(data.get("start_cursor", 0))
+        end = start + page_size
+
+        return {
+            "object": "list",
+            "results": copy.deepcopy(pages[start:end]),
+            "has_more": end < len(pages),
+            "next_cursor": str(end) if end < len(pages) else None,
+        }
+
+    def _search(self, data: dict) -> dict:
+        query = data.get("query", "").lower()
+        results = [
+            copy.deepcopy(database)
+            for database in self.databases.values()
+            if not database["archived"]
+            and query in database["title"][0]["plain_text"].lower()
+        ]
+
+        return {"object": "list", "results": results, "has_more": False}
+
+    def _matches(self, page: dict, filter: dict | None) -> bool:
+        if not filter:
+            return True
+
+        if "and" in filter:
+            return all(self._matches(page, i) for i in filter["and"])
+
+        if "or" in filter:
+            return any(self._matches(page, i) for i in filter["or"])
+
+        if "timestamp" in filter:
+            value = page[filter["timestamp"]]
+            condition = filter[filter["timestamp"]]
+        else:
+            property = page["properties"][filter["property"]]
+            value = self._plain_value(property)
+            condition = next(v for k, v in filter.items() if k != "property")
+
+        operator, operand = next(iter(condition.items()))
+        match operator:
+            case "equals":
+                return value == operand
+            case "does_not_equal":
+                return value != operand
+            case "contains":
+                return operand in (value or [])
+            case "is_empty":
+                return not value
+            case "is_not_empty":
+                return bool(value)
+            case "on_or_after":
+                return value >= operand
+            case "after":
+                return value > operand
+            case "on_or_before":
+                return value <= operand
+            case "before":
+                return value < operand
+
+        raise FakeServerError(400, "validation_error", f"Unsupported {operator}")
+
+    def _sort_key(self, page: dict, sort: dict):
+        if "timestamp" in sort:
+            return page[sort["timestamp"]]
+
+        value = self._plain_value(page["properties"][sort["property"]])
+        return (value is None, value if value is not None else 0)
+
+    @staticmethod
+    def _plain_value(property: dict):
+        value = property[property["type"]]
+        match property["type"]:
+            case "title" | "rich_text":
+                return "".join(i["plain_text"] for i in value)
+            case "multi_select":
+                return [i["name"] for i in value]
+            case "select":
+                return value["name"] if value else None
+            case "date":
+                return value["start"] if value else None
+
+        return value
+
+    def _new_id(self) -> str:
+        return str(uuid.UUID(int=self._random.getrandbits(128), version=4))
+
+    @staticmethod
+    def _normalize_id(id: str, objects: dict) -> str:
+        # Notion accepts ids with or without dashes
+        if id in objects:
+            return id
+
+        return next((i for i in objects if i.replace("-", "") == id), id)
+
+    @staticmethod
+    def _now() -> str:
+        now = datetime.now(timezone.utc)
+        return now.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+    # InspireHEP ------------------------------------------------------------- #
+    def _handle_inspire(self, path: str, params: dict, headers):
+        parts = path.strip("/").split("/")[1:]
+
+        if parts == ["literature"]:
+            return self._search_literature(params)
+
+        if len(parts) == 2:
+            kind, identifier = parts
+            if kind == "arxiv":
+                eprint = re.sub(r"v\d+$", "", identifier)
+                kind, identifier = "literature", self.eprints.get(eprint)
+
+            record = self.records.get(kind, {}).get(identifier)
+            if record is not None:
+                if params.get("format") == "bibtex":
+                    return 200, {}, self._bibtex(record)
+
+                etag = f'"{record.get("revision_id", 0)}"'
+                if headers.get("If-None-Match") == etag:
+                    return 304, {"ETag": etag}, None
+
+                data = self._record(kind, record, params.get("fields"))
+                return 200, {"ETag": etag}, data
+
+        raise FakeServerError(404, "not_found", "PID does not exist.")
+
+    def _search_literature(self, params: dict):
+        control_numbers = []
+        for term in params.get("q", "").split(" or "):
+            key, _, value = term.partition(":")
+            if key == "arxiv":
+                value = self.eprints.get(re.sub(r"v\d+$", "", value))
+            if value in self.records["literature"]:
+                control_numbers.append(value)
+
+        size = int(params.get("size", 10))
+        page = int(params.get("page", 1))
+        records = [self.records["literature"][i] for i in control_numbers]
+        records = records[(page - 1) * size : page * size]
+
+        if params.get("format") == "bibtex":
+            return 200, {}, "\n".join(self._bibtex(i) for i in records)
+
+        hits = [self._record("literature", i, params.get("fields")) for i in records]
+        return 200, {}, {"hits": {"hits": hits, "total": len(control_numbers)}}
+
+    def _record(self, kind: str, record: dict, fields: str | None) -> dict:
+        metadata = record["metadata"]
+        if fields:
+            names = {i.split(".")[0] for i in fields.split(",")}
+            metadata = {k: v for k, v in metadata.items() if k in names}
+
+        control_number = record["metadata"]["control_number"]
+        links = {"json": f"{self.inspire_url}/{kind}/{control_number}?format=json"}
+        if kind == "literature":
+            links["bibtex"] = (
+                f"{self.inspire_url}/literature/{control_number}?format=bibtex"
+            )
+
+        return record | {"metadata": metadata, "links": links}
+
+    @staticmethod
+    def _bibtex(record: dict) -> str:
+        metadata = record["metadata"]
+        texkey = metadata.get("texkeys", [metadata["control_number"]])[0]
+        title = metadata["titles"][0]["title"]
+        eprint = metadata.get("arxiv_eprints", [{}])[0].get("value", "")
+
+        return (
+            f"@article{{{texkey},\n"
+            f'    title = "{{{title}}}",\n'
+            f'    eprint = "{eprint}"\n'
+            "}\n"
+        )
+
+
+def create_app_dir(home: Path, database_id: str) -> None:
+    """Set up `hpm` in `home` as `hpm init` would, for a fake server.
+
+    The server does the rate limiting, if any.
+    """
+    import yaml
+
+    app_dir = home / ".hpm"
+    (app_dir / "templates").mkdir(parents=True)
+    (app_dir / "TOKEN").write_text("token")
+    (app_dir / "config.ini").write_text(
+        "[notion_client]\npage_size = 100\nrate = 1000\nburst = 1000\n"
+    )
+
+    template = yaml.safe_load(TEMPLATE_FILE.read_text())
+    template["database_id"] = database_id
+    (app_dir / "templates" / "paper.yml").write_text(yaml.dump(template))
+
+
+def _text(content: str) -> list[dict]:
+    return [{"type": "text", "text": {"content": content}}]
+
+
+class FakeRequestHandler(BaseHTTPRequestHandler):
+    # Keep connections alive, like the real APIs
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    fake: FakeServer
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+    def do_PATCH(self) -> None:
+        self._handle("PATCH")
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _handle(self, method: str) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length > 0 else b""
+
+        status, headers, data = self.fake.handle(method, self.path, self.headers, body)
+
+        if data is None:
+            content = b""
+        elif isinstance(data, str):
+            content = data.encode()
+            headers.setdefault("Content-Type", "application/x-bibtex")
+        else:
+            content = json.dumps(data).encode()
+            headers.setdefault("Content-Type", "application/json")
+
+        with self.fake._lock:
+            self.fake.stats["bytes_out"] += len(content)
+
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
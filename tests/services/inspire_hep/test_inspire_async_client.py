@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+import httpx
+
+from hpm.services.inspire_hep.async_client import AsyncInspireHEP
+
+
+def load_paper(identifier_value):
+    return json.load(open(f"tests/services/inspire_hep/paper-{identifier_value}.json"))
+
+
+def test_async_inspire_hep():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.url.path == "/api/literature":
+            query = request.url.params["q"]
+            if request.url.params.get("format") == "bibtex":
+                identifier_values = query.replace("control_number:", "").split(" or ")
+                if request.url.params["page"] != "1":
+                    identifier_values = []
+
+                text = "\n".join(f"@article{{key{i},\n}}" for i in identifier_values)
+                return httpx.Response(200, text=text)
+
+            hits = [load_paper("1405106")] if "1511.05190" in query else []
+            return httpx.Response(200, json={"hits": {"hits": hits, "total": 1}})
+
+        return httpx.Response(200, json=load_paper("779080"))
+
+    async def main():
+        transport = httpx.MockTransport(handler)
+        client = httpx.AsyncClient(transport=transport)
+        async with AsyncInspireHEP(client=client) as inspire_hep:
+            paper = await inspire_hep.get_paper("779080")
+            papers = await inspire_hep.get_papers(
+                ["1511.05190v2", "0000.00000"], chunk_size=1
+            )
+            entries = await inspire_hep.get_bibtex(["1", "2", "3"], chunk_size=2)
+
+        return paper, papers, entries
+
+    paper, papers, entries = asyncio.run(main())
+    assert paper["metadata"]["control_number"] == 779080
+    assert papers["1511.05190v2"]["metadata"]["control_number"] == 1405106
+    assert papers["0000.00000"] is None
+    assert list(sorted(entries)) == ["key1", "key2", "key3"]
+
+    # Each chunk is searched for separately
+    assert requests[0].url.path == "/api/literature/779080"
+    assert len(requests) == 6
@@ -0,0 +1,115 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from hpm.services.inspire_hep.cache import InspireCache
+from hpm.services.inspire_hep.client import InspireHEP
+
+
+class FakeInspireHEP(InspireHEP):
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+        self.is_modified = True
+
+    def request(self, identifier_type, identifier_value, fields=None, headers=None):
+        self.requests.append((identifier_type, identifier_value, headers))
+
+        response = MagicMock()
+        response.headers = {"ETag": '"1"'}
+        if headers and headers.get("If-None-Match") == '"1"' and not self.is_modified:
+            response.status_code = 304
+        else:
+            response.status_code = 200
+            response.json.return_value = json.load(
+                open(f"tests/services/inspire_hep/paper-{identifier_value}.json")
+            )
+
+        return response
+
+    def get_papers(self, identifier_values, chunk_size=50, fields=None):
+        self.requests.append(("literature", identifier_values, fields))
+        papers = {}
+        for i in identifier_values:
+            papers[i] = json.load(open(f"tests/services/inspire_hep/paper-{i}.json"))
+            if self.is_modified and fields is not None:
+                papers[i]["revision_id"] += 1
+
+        return papers
+
+
+def test_cache(tmp_path):
+    file = tmp_path / "cache.json"
+    client = FakeInspireHEP()
+
+    # The first retrieval is a miss
+    cache = InspireCache(client, file)
+    paper = cache.get_paper("1511.05190")
+    assert paper.id == "1405106"
+    assert len(client.requests) == 1
+
+    # Then the paper is cached by both its arXiv id and record id
+    assert cache.get_paper("1511.05190") == paper
+    assert cache.get_papers(["1405106"]) == {"1405106": paper}
+    assert len(client.requests) == 1
+    cache.save()
+
+    stats = InspireCache(client, file).stats()
+    assert stats["papers"] == 1
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+
+    # An expired paper is revalidated with its ETag
+    client.is_modified = False
+    cache = InspireCache(client, file, ttls={"paper": 0})
+    assert cache.get_paper("1511.05190") == paper
+    assert client.requests[-1][2] == {"If-None-Match": '"1"'}
+    assert cache.counters["revalidated"] == 1
+
+    # Papers not freshly cached are searched for in a batch, those cached only
+    # if their records have changed
+    cache.get_papers(["1511.05190", "779080"])
+    assert client.requests[-2:] == [
+        ("literature", ["1511.05190"], "control_number,arxiv_eprints"),
+        ("literature", ["779080"], None),
+    ]
+    assert cache.counters["revalidated"] == 2
+
+    # Even freshly cached papers are revalidated if asked
+    client.is_modified = True
+    cache = InspireCache(client, file)
+    cache.get_papers(["1511.05190"], revalidate=True)
+    assert client.requests[-2:] == [
+        ("literature", ["1511.05190"], "control_number,arxiv_eprints"),
+        ("literature", ["1511.05190"], None),
+    ]
+
+    # The least recently used papers are evicted, once new ones are stored
+    cache = InspireCache(client, file)
+    cache.get_paper("779080")
+    cache.get_paper("1511.05190")
+    assert list(cache.entries) == ["paper:779080", "paper:1405106"]
+
+    cache = InspireCache(client, file, max_entries=1)
+    assert list(cache.entries) == ["paper:1405106"]
+    cache.get_paper("779080")
+    assert list(cache.entries) == ["paper:779080"]
+    cache.save()
+    assert InspireCache(client, file).stats()["papers"] == 1
+
+    cache.clear()
+    assert not file.exists()
+
+
+def test_cache_threads(tmp_path):
+    client = FakeInspireHEP()
+    cache = InspireCache(client, tmp_path / "cache.json")
+    cache.get_papers(["1511.05190", "779080"])
+
+    # The stages of `hpm update all` share the cache
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        ids = ["1511.05190", "779080"] * 100
+        papers = list(executor.map(cache.get_paper, ids))
+
+    assert [paper.id for paper in papers[:2]] == ["1405106", "779080"]
+    assert cache.counters["hits"] == 200
@@ -22,3 +22,16 @@ def test_get_paper_by_arxiv_id(client):
 
 def test_get_job_by_id(client):
     client.get_job("2832881")
+
+
+def test_get_papers(client):
+    papers = client.get_papers(["1511.05190", "779080", "0000.00000"], chunk_size=2)
+    assert papers["1511.05190"]["metadata"]["control_number"] == 1405106
+    assert papers["779080"]["metadata"]["control_number"] == 779080
+    assert papers["0000.00000"] is None
+
+
+def test_get_bibtex(client):
+    entries = client.get_bibtex(["1511.05190", "779080"])
+    assert entries["deOliveira:2015xxd"].startswith("@article{deOliveira:2015xxd,")
+    assert len(entries) == 2
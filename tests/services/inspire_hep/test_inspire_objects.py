@@ -28,6 +28,11 @@ def test_paper():
     response = json.load(open("tests/services/inspire_hep/paper-1405106.json", "r"))
     paper = Paper.from_response(response)
     assert paper.id == "1405106"
+    assert paper.texkey == "deOliveira:2015xxd"
+
+    # BibTeX is fetched on demand
+    assert paper.bibtex is None
+    assert paper.bibtex_link == response["links"]["bibtex"]
 
     cache = TinyDB(storage=MemoryStorage)
     cache.insert(paper.as_dict())
@@ -60,3 +65,37 @@ def test_job():
     cached_job = Job.from_cache(cache.get(Query().id == "2832881"))
     assert job == cached_job
     assert job.as_dict() == cached_job.as_dict()
+
+
+def test_paper_fields():
+    fields = Paper.fields(["title", "authors.name", "citation_count"])
+    assert fields == [
+        "control_number",
+        "arxiv_eprints",
+        "titles",
+        "authors.full_name",
+        "authors.record",
+        "citation_count",
+    ]
+
+    # A record with only these fields can still be parsed
+    response = json.load(open("tests/services/inspire_hep/paper-1405106.json", "r"))
+    metadata = response["metadata"]
+    response["metadata"] = {
+        "control_number": metadata["control_number"],
+        "arxiv_eprints": metadata["arxiv_eprints"],
+        "titles": metadata["titles"],
+        "authors": [
+            {"full_name": i["full_name"], "record": i["record"]}
+            for i in metadata["authors"]
+        ],
+        "citation_count": metadata["citation_count"],
+    }
+
+    paper = Paper.from_response(response)
+
+    assert paper.id == "1405106"
+    assert paper.eprint == "1511.05190"
+    assert paper.citation_count == metadata["citation_count"]
+    assert len(paper.authors) == 5
+    assert paper.abstract is None
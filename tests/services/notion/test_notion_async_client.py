@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import httpx
+
+import hpm.services.notion.objects.page_properties as pg_props
+from hpm.services.notion.async_client import AsyncNotion
+
+
+def test_async_notion():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.url.path.endswith("/missing"):
+            return httpx.Response(404, json={"code": "object_not_found"})
+
+        return httpx.Response(200, json={"path": request.url.path})
+
+    async def main():
+        transport = httpx.MockTransport(handler)
+        async with AsyncNotion(
+            "token", httpx.AsyncClient(transport=transport)
+        ) as notion:
+            # Many requests can be in flight at once
+            responses = await asyncio.gather(
+                notion.retrieve_page("page1"),
+                notion.update_page("page2", {"Title": pg_props.Title("Page2")}),
+                notion.query_database("database", filter={"property": "Title"}),
+            )
+
+            try:
+                await notion.retrieve_page("missing")
+            except ValueError as e:
+                error = str(e)
+
+        return responses, error
+
+    responses, error = asyncio.run(main())
+    assert [i["path"] for i in responses] == [
+        "/v1/pages/page1",
+        "/v1/pages/page2",
+        "/v1/databases/database/query",
+    ]
+    assert error.startswith("Failed to retrieve page:")
+
+    assert requests[0].headers["Authorization"] == "Bearer token"
+    assert json.loads(requests[1].content) == {
+        "properties": {"Title": pg_props.Title("Page2").as_dict()}
+    }
+    assert json.loads(requests[2].content) == {
+        "page_size": 100,
+        "filter": {"property": "Title"},
+    }
+
+
+def test_async_iter_database():
+    def handler(request):
+        cursor = int(json.loads(request.content).get("start_cursor", 0))
+        return httpx.Response(
+            200,
+            json={
+                "results": [{"id": f"page{cursor}"}],
+                "has_more": cursor < 2,
+                "next_cursor": str(cursor + 1),
+            },
+        )
+
+    async def main():
+        transport = httpx.MockTransport(handler)
+        async with AsyncNotion(
+            "token", httpx.AsyncClient(transport=transport)
+        ) as notion:
+            return [i["id"] async for i in notion.iter_database("database")]
+
+    assert asyncio.run(main()) == ["page0", "page1", "page2"]
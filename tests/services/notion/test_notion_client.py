@@ -74,6 +74,15 @@ def test_basic_usage(TEST_PAGE_ID):
     response = notion.query_database(database1.id)
     assert len(response["results"]) == 2
 
+    # Or let Notion filter and sort the pages
+    response = notion.query_database(
+        database1.id,
+        filter={"property": "Title", "title": {"equals": "Page2"}},
+        sorts=[{"timestamp": "last_edited_time", "direction": "ascending"}],
+    )
+    assert len(response["results"]) == 1
+    assert Page.from_response(response["results"][0]) == page2
+
     # Or sometimes pages are too many to query all at once
     response = notion.query_database(database1.id, page_size=1)
     assert len(response["results"]) == 1
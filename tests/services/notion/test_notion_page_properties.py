@@ -160,3 +160,15 @@ def test_url(test_full_page, test_empty_page):
 
     assert property.value == expected.value
     assert property.as_dict() == expected.as_dict()
+
+
+def test_validation():
+    # Properties built by users are validated
+    with pytest.raises(ValueError):
+        Number("not a number")
+
+    # Properties parsed from responses are not, but equal the validated ones
+    property = Number.from_trusted(1.5, "id")
+    assert property == Number(1.5, "id")
+    assert property.type == "number"
+    assert not hasattr(property, "__dict__")
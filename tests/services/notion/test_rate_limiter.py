@@ -0,0 +1,97 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from hpm.services.notion.async_client import AsyncNotion
+from hpm.services.notion.client import Notion
+from hpm.services.notion.rate_limiter import RateLimiter
+from hpm.services.transport import Transport
+
+
+def make_response(status_code, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.json.return_value = {"status": status_code}
+    return response
+
+
+def test_rate_limiter():
+    rate_limiter = RateLimiter(rate=10, burst=2, max_retries=2, backoff=0.1)
+
+    # A full bucket lets a burst through, then requests wait for their turn
+    assert rate_limiter.reserve() == 0
+    assert rate_limiter.reserve() == 0
+    assert 0.09 < rate_limiter.reserve() <= 0.1
+    assert 0.19 < rate_limiter.reserve() <= 0.2
+    assert rate_limiter.stats()["requests"] == 4
+
+    # Retry-After is honoured and pauses the other requests
+    rate_limiter = RateLimiter(rate=10, max_retries=2, backoff=0.1)
+    response = make_response(429, {"Retry-After": "5"})
+    assert rate_limiter.retry_delay(response, 0) == 5
+    assert 4.9 < rate_limiter.reserve() <= 5
+
+    # The requests queued meanwhile are then spaced out at the rate
+    delays = [rate_limiter.reserve() for _ in range(3)]
+    assert [round(i - delays[0], 2) for i in delays] == [0, 0.1, 0.2]
+    assert 4.9 < delays[0] <= 5.1
+
+    # Server errors are retried with a jittered backoff, up to max_retries
+    response = make_response(503)
+    assert 0 <= rate_limiter.retry_delay(response, 1) <= 0.2
+    assert rate_limiter.retry_delay(response, 2) is None
+    assert rate_limiter.retry_delay(make_response(400), 0) is None
+    assert rate_limiter.stats()["retries"] == 2
+
+    # Unless the request is not idempotent, which is only retried if rate limited
+    assert rate_limiter.retry_delay(response, 0, retry_server_errors=False) is None
+    response = make_response(429, {"Retry-After": "1"})
+    assert rate_limiter.retry_delay(response, 0, retry_server_errors=False) == 1
+
+
+def test_notion_retries():
+    transport = MagicMock(spec=Transport)
+    transport.request.side_effect = [
+        make_response(429, {"Retry-After": "0"}),
+        make_response(502, {"Retry-After": "0"}),
+        make_response(200),
+    ]
+    notion = Notion("token", transport, RateLimiter(rate=100))
+    assert notion.retrieve_page("page") == {"status": 200}
+    assert transport.request.call_count == 3
+
+    # Requests still failing after the retries raise as before
+    transport.request.side_effect = [make_response(429, {"Retry-After": "0"})] * 2
+    notion = Notion("token", transport, RateLimiter(rate=100, max_retries=1))
+    with pytest.raises(ValueError, match="Failed to retrieve page"):
+        notion.retrieve_page("page")
+
+    # A page may have been created despite a server error, so it is not retried
+    transport.request.side_effect = [
+        make_response(502, {"Retry-After": "0"}),
+        make_response(200),
+    ]
+    transport.request.reset_mock()
+    notion = Notion("token", transport, RateLimiter(rate=100))
+    with pytest.raises(ValueError, match="Failed to create page"):
+        notion.create_page("database", {})
+    assert transport.request.call_count == 1
+
+
+def test_async_notion_retries():
+    responses = [
+        httpx.Response(429, headers={"Retry-After": "0"}, json={}),
+        httpx.Response(200, json={"object": "page"}),
+    ]
+
+    async def main():
+        transport = httpx.MockTransport(lambda request: responses.pop(0))
+        client = httpx.AsyncClient(transport=transport)
+        async with AsyncNotion("token", client, RateLimiter(rate=100)) as notion:
+            return await notion.retrieve_page("page")
+
+    assert asyncio.run(main()) == {"object": "page"}
+    assert responses == []
@@ -0,0 +1,51 @@
+from hpm.services import instrumentation
+from hpm.services.inspire_hep.client import InspireHEP
+from hpm.services.notion.client import Notion
+from hpm.services.notion.rate_limiter import RateLimiter
+from hpm.services.transport import Transport
+
+
+def test_endpoint():
+    endpoint = instrumentation.endpoint
+    assert endpoint("https://api.notion.com/v1/pages") == "/v1/pages"
+    assert (
+        endpoint("https://api.notion.com/v1/databases/1261444c50e4808e83cde7c2fe05ded8")
+        == "/v1/databases/{id}"
+    )
+    assert endpoint("https://inspirehep.net/api/arxiv/1511.05190") == "/api/arxiv/{id}"
+    assert (
+        endpoint("https://inspirehep.net/api/literature/1405106?format=bibtex")
+        == "/api/literature/{id}?format=bibtex"
+    )
+    assert endpoint("https://inspirehep.net/api/literature?q=a&size=1") == (
+        "/api/literature"
+    )
+
+
+def test_hooks(fake_server):
+    events = []
+    instrumentation.add_hook(events.append)
+    try:
+        rate_limiter = RateLimiter(rate=100, burst=100, backoff=0.01)
+        notion = Notion("token", Transport(), rate_limiter, fake_server.notion_url)
+        database_id = fake_server.create_database("Papers", {"Title": "title"})
+
+        fake_server.fail(502)
+        notion.retrieve_database(database_id)
+
+        inspire_hep = InspireHEP(
+            transport=Transport(), base_url=fake_server.inspire_url
+        )
+        inspire_hep.get_paper("1405106")
+    finally:
+        instrumentation.remove_hook(events.append)
+
+    # Retried requests are reported once
+    assert [(i.service, i.method, i.endpoint) for i in events] == [
+        ("notion", "GET", "/v1/databases/{id}"),
+        ("inspire_hep", "GET", "/api/literature/{id}"),
+    ]
+    assert events[0].status == 200
+    assert events[0].retries == 1
+    assert events[1].bytes_received > 0
+    assert all(i.latency > 0 for i in events)
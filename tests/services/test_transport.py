@@ -0,0 +1,29 @@
+from unittest.mock import MagicMock
+
+from hpm.services.transport import Transport, get_default_transport
+
+
+def test_transport():
+    transport = Transport(pool_maxsize=4, connect_timeout=1, read_timeout=2)
+
+    # One pooled session per host
+    session = transport.session("https://api.notion.com/v1/pages")
+    assert transport.session("https://api.notion.com/v1/search") is session
+    assert transport.session("https://inspirehep.net/api") is not session
+    assert session.get_adapter("https://api.notion.com")._pool_maxsize == 4
+    assert session.headers["Accept-Encoding"] == "gzip, deflate"
+
+    # Requests are sent with the default timeouts
+    session.request = MagicMock()
+    transport.get("https://api.notion.com/v1/pages/1")
+    session.request.assert_called_once_with(
+        "GET", "https://api.notion.com/v1/pages/1", timeout=(1, 2)
+    )
+
+    transport.close()
+    assert transport.sessions == {}
+
+    assert Transport(gzip=False).session("https://a").headers["Accept-Encoding"] == (
+        "identity"
+    )
+    assert get_default_transport() is get_default_transport()
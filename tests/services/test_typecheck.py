@@ -0,0 +1,17 @@
+import pytest
+from typeguard import TypeCheckError
+
+from hpm.services.typecheck import typechecked
+
+
+def add(a: int, b: int) -> int:
+    return a + b
+
+
+def test_typechecked(monkeypatch):
+    monkeypatch.setenv("HPM_TYPECHECK", "0")
+    assert typechecked(add) is add
+
+    monkeypatch.setenv("HPM_TYPECHECK", "1")
+    with pytest.raises(TypeCheckError):
+        typechecked(add)(1, "2")
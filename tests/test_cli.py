@@ -1,5 +1,6 @@
 import os
 import shutil
+from configparser import ConfigParser
 from unittest.mock import patch
 
 from typer.testing import CliRunner
@@ -20,7 +21,7 @@ def test_init():
         os.rename(config.app_dir, config.app_dir.parent / ".hpm.backup")
         is_backed_up = True
 
-    with patch("hpm.cli.Prompt.ask") as mock_prompt:
+    with patch("rich.prompt.Prompt.ask") as mock_prompt:
         # First time
         mock_prompt.side_effect = [
             os.getenv("NOTION_ACCESS_TOKEN_FOR_HPM"),
@@ -157,6 +158,16 @@ def test_add_and_update():
     result = runner.invoke(app, ["update", "all"])
     assert result.exit_code == 0
 
+    # Update all papers concurrently
+    result = runner.invoke(app, ["update", "all", "--jobs", "4"])
+    assert result.exit_code == 0
+    assert "Paper [1/" in result.stdout
+
+    # Update only the citation counts of all papers
+    result = runner.invoke(app, ["update", "all", "--citations-only"])
+    assert result.exit_code == 0
+    assert "citation count(s) changed" in result.stdout
+
     # Clean up
     notion.archive_page(page_id)
     config.save_config_for_notion_client({"page_size": original_page_size})
@@ -200,8 +211,255 @@ def test_info_and_clean(TEST_PAPERS_DATABASE_ID):
         os.rename(config.app_dir.parent / ".hpm.backup", config.app_dir)
 
 
+def test_cache(fake_app):
+    result = runner.invoke(app, ["add", fake_app[3]])
+    assert result.exit_code == 0
+
+    result = runner.invoke(app, ["cache", "stats"])
+    assert result.exit_code == 0
+    assert "Papers: 1" in result.stdout
+    assert "Hits" in result.stdout
+
+    result = runner.invoke(app, ["cache", "clear"])
+    assert result.exit_code == 0
+    assert "Cleared!" in result.stdout
+    assert not Config().cache_file.exists()
+
+
 def test_version():
     result = runner.invoke(app, ["-v"])
     assert result.exit_code == 0
     assert "HEP Paper Manager" in result.stdout
     assert "Made by Star9daisy" in result.stdout
+
+
+def test_add_many(fake_app, fake_server, tmp_path):
+    file = tmp_path / "ids.txt"
+    file.write_text(
+        "\n".join(
+            [
+                fake_app[0],
+                "# A comment",
+                fake_app[3],
+                "9000003  # The same paper by its record id",
+                "9999.99999",
+            ]
+        )
+    )
+
+    result = runner.invoke(app, ["add", "-f", str(file), "-j", "2"])
+    assert result.exit_code == 1
+    assert f"[1/4] [{fake_app[0]}] Already in the database" in result.stdout
+    assert f"[2/4] [{fake_app[3]}] Generated paper 3" in result.stdout
+    assert f"[3/4] [9000003] Same paper as [{fake_app[3]}]" in result.stdout
+    assert "[4/4] [9999.99999] Not found in InspireHEP" in result.stdout
+    assert fake_server.stats["requests"]["POST /v1/pages"] == 1
+
+    # From stdin, and from a search
+    result = runner.invoke(app, ["add", "-f", "-"], input=f"{fake_app[3]}\n")
+    assert result.exit_code == 0
+    assert "0 added, 1 already in the database" in result.stdout
+
+    result = runner.invoke(app, ["add", "-q", "control_number:1405106"])
+    assert result.exit_code == 0
+    assert "[1/1] [1511.05190] Jet-images" in result.stdout
+    assert fake_server.stats["requests"]["POST /v1/pages"] == 2
+
+    result = runner.invoke(app, ["add", fake_app[3], "-q", "a Witten"])
+    assert result.exit_code == 1
+
+
+def test_pages_added_since_sync(fake_app, fake_server):
+    result = runner.invoke(app, ["update", "all"])
+    assert result.exit_code == 0
+
+    # A page added from elsewhere while the mirror is fresh
+    database_id = next(iter(fake_server.databases))
+    properties = {
+        "Title": {"title": [{"text": {"content": "Generated paper 3"}}]},
+        "ArXiv ID": {"rich_text": [{"text": {"content": fake_app[3]}}]},
+    }
+    fake_server.create_page(database_id, properties)
+
+    result = runner.invoke(app, ["add", fake_app[3]])
+    assert result.exit_code == 1
+    assert "Already in the database" in result.stdout
+
+    result = runner.invoke(app, ["update", fake_app[3]])
+    assert result.exit_code == 0
+    assert fake_server.stats["requests"]["POST /v1/pages"] == 0
+
+
+def test_add_with_cached_schema(fake_app, fake_server):
+    result = runner.invoke(app, ["add", fake_app[3]])
+    assert result.exit_code == 0
+    assert fake_server.stats["requests"]["GET /v1/databases/{id}"] == 1
+
+    # The schema is cached
+    fake_server.generate_papers(5)
+    result = runner.invoke(app, ["add", "2001.00004"])
+    assert result.exit_code == 0
+    assert fake_server.stats["requests"]["GET /v1/databases/{id}"] == 1
+
+    # And retrieved again once it has changed in Notion
+    database = next(iter(fake_server.databases.values()))
+    database["properties"]["DOI"] |= {"type": "url", "url": {}}
+    result = runner.invoke(app, ["add", "1511.05190"])
+    assert result.exit_code == 0
+    assert fake_server.stats["requests"]["GET /v1/databases/{id}"] == 2
+    assert fake_server.stats["requests"]["POST /v1/pages"] == 4
+
+
+def test_update_all(fake_app, fake_server):
+    # A paper failing to update does not stop the others
+    fake_server.fail(status=400, path="/v1/pages/")
+    result = runner.invoke(app, ["--profile", "update", "all", "-j", "2"])
+    assert result.exit_code == 1
+    assert "[3]" in result.stdout
+    assert "1 paper(s) failed to update" in result.stdout
+    assert "Pipeline of" in result.stdout
+    assert fake_server.stats["requests"]["PATCH /v1/pages/{id}"] == 3
+
+    # Only the failed paper is still to be updated
+    result = runner.invoke(app, ["update", "all"])
+    assert result.exit_code == 0
+    assert fake_server.stats["requests"]["PATCH /v1/pages/{id}"] == 4
+
+
+def test_update_citations_failed(fake_app, fake_server):
+    result = runner.invoke(app, ["update", "all"])
+    assert result.exit_code == 0
+
+    for record in fake_server.records["literature"].values():
+        record["metadata"] = record["metadata"] | {"citation_count": 1234}
+
+    # A citation count failing to be written is not taken as written
+    fake_server.fail(status=400, path="/v1/pages/")
+    result = runner.invoke(app, ["update", "all", "--citations-only"])
+    assert result.exit_code == 1
+
+    result = runner.invoke(app, ["update", "all", "--citations-only", "--resume"])
+    assert result.exit_code == 0
+    assert "1 of 1 citation count(s) changed" in result.stdout
+
+    # Nor when updating all properties
+    for record in fake_server.records["literature"].values():
+        record["metadata"] = record["metadata"] | {"citation_count": 5678}
+        record["revision_id"] += 1
+
+    fake_server.fail(status=400, path="/v1/pages/")
+    result = runner.invoke(app, ["update", "all"])
+    assert result.exit_code == 1
+
+    result = runner.invoke(app, ["update", "all", "--citations-only"])
+    assert result.exit_code == 0
+    assert "1 of 3 citation count(s) changed" in result.stdout
+
+    citations = [
+        i["properties"]["Citations"]["number"] for i in fake_server.pages.values()
+    ]
+    assert citations == [5678] * 3
+
+
+def test_deleted_pages(fake_app, fake_server, tmp_path):
+    result = runner.invoke(app, ["update", "all"])
+    assert result.exit_code == 0
+
+    # Pages archived in Notion since the mirror was synced, whose papers have
+    # been cited since
+    for page in fake_server.pages.values():
+        page["archived"] = page["in_trash"] = True
+    for record in fake_server.records["literature"].values():
+        record["metadata"] = record["metadata"] | {"citation_count": 1234}
+
+    # Updating the citation counts only syncs the pages edited since
+    result = runner.invoke(app, ["update", "all", "--citations-only"])
+    assert result.exit_code == 0
+    assert "3 page(s) deleted from the database" in result.stdout
+
+    # The pages are checked before telling they are already in the database
+    fake_server.reset_stats()
+    result = runner.invoke(app, ["add", fake_app[0]])
+    assert result.exit_code == 0
+    assert fake_server.stats["requests"]["POST /v1/pages"] == 1
+
+    file = tmp_path / "ids.txt"
+    file.write_text("\n".join(fake_app[:2]))
+    for page in fake_server.pages.values():
+        page["archived"] = page["in_trash"] = True
+
+    result = runner.invoke(app, ["add", "-f", str(file)])
+    assert result.exit_code == 0
+    assert "2 added" in result.stdout
+    assert fake_server.stats["requests"]["GET /v1/pages/{id}"] == 1
+
+
+def test_deleted_pages_full_sync(fake_app, fake_server, tmp_path):
+    result = runner.invoke(app, ["update", "all"])
+    assert result.exit_code == 0
+
+    for page in fake_server.pages.values():
+        page["archived"] = page["in_trash"] = True
+
+    # Many papers found in the database are checked with a full sync rather
+    # than by retrieving each page
+    fake_server.reset_stats()
+    file = tmp_path / "ids.txt"
+    file.write_text("\n".join(fake_app[:3]))
+    result = runner.invoke(app, ["add", "-f", str(file)])
+    assert result.exit_code == 0
+    assert "3 added" in result.stdout
+    assert fake_server.stats["requests"]["GET /v1/pages/{id}"] == 0
+    assert fake_server.stats["requests"]["POST /v1/databases/{id}/query"] == 2
+
+
+def test_update_revalidates_cache(fake_app, fake_server):
+    result = runner.invoke(app, ["update", "all"])
+    assert result.exit_code == 0
+
+    # A record changed since is retrieved again, although freshly cached
+    record = fake_server.records["literature"]["9000000"]
+    record["metadata"] = record["metadata"] | {"citation_count": 1234}
+    record["revision_id"] += 1
+
+    result = runner.invoke(app, ["update", fake_app[0]])
+    assert result.exit_code == 0
+    assert "Updating Citations" in result.stdout
+    assert "-> 1234" in result.stdout
+
+    # While unchanged records only cost a search for their versions
+    fake_server.reset_stats()
+    result = runner.invoke(app, ["update", "all"])
+    assert result.exit_code == 0
+    assert fake_server.stats["requests"]["GET /api/literature"] == 1
+    assert fake_server.stats["requests"]["PATCH /v1/pages/{id}"] == 0
+
+
+def test_update_all_resume(fake_app, fake_server):
+    # Query the database one page at a time
+    config = Config()
+    parser = ConfigParser()
+    parser.read(config.config_file)
+    parser["notion_client"]["page_size"] = "1"
+    with open(config.config_file, "w") as f:
+        parser.write(f)
+
+    # Interrupted when querying the third page, after retrieving the schema
+    fake_server.fail(status=400, path="/v1/databases", after=3)
+    result = runner.invoke(app, ["update", "all"])
+    assert result.exit_code == 1
+    assert config.journal_file.exists()
+    assert fake_server.stats["requests"]["PATCH /v1/pages/{id}"] == 2
+
+    # Only the third paper is left, in the batch after the second one
+    fake_server.reset_stats()
+    result = runner.invoke(app, ["update", "all", "--resume"])
+    assert result.exit_code == 0
+    assert "Resuming, 2 paper(s) already done" in result.stdout
+    assert fake_server.stats["requests"]["POST /v1/databases/{id}/query"] == 2
+    assert fake_server.stats["requests"]["PATCH /v1/pages/{id}"] == 1
+    assert not config.journal_file.exists()
+
+    result = runner.invoke(app, ["update", "all", "--resume"])
+    assert result.exit_code == 0
+    assert "No interrupted update to resume" in result.stdout
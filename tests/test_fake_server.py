@@ -0,0 +1,112 @@
+import hpm.services.notion.objects.database_properties as db_props
+import hpm.services.notion.objects.page_properties as pg_props
+from hpm.services.inspire_hep.cache import InspireCache
+from hpm.services.inspire_hep.client import InspireHEP
+from hpm.services.inspire_hep.objects import Paper
+from hpm.services.notion.client import Notion
+from hpm.services.notion.objects.database import Database
+from hpm.services.notion.objects.page import Page
+from hpm.services.notion.rate_limiter import RateLimiter
+from hpm.services.transport import Transport
+
+
+def test_notion(fake_server):
+    rate_limiter = RateLimiter(rate=100, burst=100)
+    notion = Notion("token", Transport(), rate_limiter, fake_server.notion_url)
+
+    response = notion.create_database(
+        parent_id="page",
+        title="Papers",
+        properties={
+            "Title": db_props.Title(),
+            "Number": db_props.Number(),
+            "Tags": db_props.MultiSelect(),
+        },
+    )
+    database = Database.from_response(response)
+    assert Database.from_response(notion.retrieve_database(database.id)) == database
+    assert len(notion.search_database("Papers")["results"]) == 1
+
+    # Pages have all properties of the database, empty if not given
+    response = notion.create_page(database.id, {"Title": pg_props.Title("A")})
+    page = Page.from_response(response)
+    assert page.title == "A"
+    assert page.properties["Number"].value is None
+    assert Page.from_response(notion.retrieve_page(page.id)) == page
+
+    response = notion.update_page(page.id, {"Tags": pg_props.MultiSelect(["x"])})
+    assert Page.from_response(response).properties["Tags"].value == ["x"]
+
+    for i in range(4):
+        notion.create_page(database.id, {"Number": pg_props.Number(i)})
+
+    # Filters
+    filter = {"property": "Title", "title": {"equals": "A"}}
+    response = notion.query_database(database.id, filter=filter)
+    assert [i["id"] for i in response["results"]] == [page.id]
+
+    # Pagination
+    fake_server.max_page_size = 2
+    pages = list(notion.iter_database(database.id))
+    assert len(pages) == 5
+    assert fake_server.stats["requests"]["POST /v1/databases/{id}/query"] == 4
+
+    # Archived pages are not queried anymore
+    notion.archive_page(page.id)
+    assert len(list(notion.iter_database(database.id))) == 4
+
+
+def test_notion_validation_error(fake_server):
+    rate_limiter = RateLimiter(rate=100, burst=100)
+    notion = Notion("token", Transport(), rate_limiter, fake_server.notion_url)
+    database_id = fake_server.create_database("Papers", {"Title": "title"})
+
+    try:
+        notion.create_page(database_id, {"Missing": pg_props.RichText("a")})
+    except ValueError as e:
+        assert "validation_error" in str(e)
+    else:
+        assert False, "Unknown properties should be rejected"
+
+
+def test_notion_retries(fake_server):
+    rate_limiter = RateLimiter(rate=100, burst=100, backoff=0.01)
+    notion = Notion("token", Transport(), rate_limiter, fake_server.notion_url)
+    database_id = fake_server.create_database("Papers", {"Title": "title"})
+
+    # Failed requests are retried
+    fake_server.fail(502, count=2)
+    notion.retrieve_database(database_id)
+    assert rate_limiter.n_retries == 2
+
+    # The client slows down to the rate limit of the server
+    fake_server.rate_limit = 20
+    for _ in range(30):
+        notion.retrieve_database(database_id)
+    assert rate_limiter.n_retries > 2
+
+
+def test_inspire_hep(fake_server):
+    inspire_hep = InspireHEP(transport=Transport(), base_url=fake_server.inspire_url)
+
+    paper = Paper.from_response(inspire_hep.get_paper("1511.05190"))
+    assert paper.id == "1405106"
+    assert paper.load_bibtex(inspire_hep.transport).startswith("@article")
+
+    eprints = fake_server.generate_papers(120)
+    papers = inspire_hep.get_papers(eprints + ["9999.99999"])
+    assert all(papers[i] is not None for i in eprints)
+    assert papers["9999.99999"] is None
+    assert fake_server.stats["requests"]["GET /api/literature"] == 3
+
+    entries = inspire_hep.get_bibtex(eprints[:60])
+    assert len(entries) == 60
+
+
+def test_inspire_cache_revalidation(fake_server, tmp_path):
+    inspire_hep = InspireHEP(transport=Transport(), base_url=fake_server.inspire_url)
+    cache = InspireCache(inspire_hep, tmp_path / "cache.json", ttls={"paper": 0})
+
+    paper = cache.get_paper("1405106")
+    assert cache.get_paper("1405106") == paper
+    assert cache.counters["revalidated"] == 1
@@ -0,0 +1,164 @@
+from hpm.mirror import Mirror
+from hpm.services.notion.client import Notion, NotionError
+from hpm.services.notion.objects.page import Page
+
+PROPERTIES = {"url": "URL", "title": "Title", "eprint": "ArXiv ID"}
+
+
+def make_page(id, title, eprint, inspire_id, last_edited_time, archived=False):
+    return {
+        "id": id,
+        "url": f"https://www.notion.so/{id}",
+        "last_edited_time": last_edited_time,
+        "archived": archived,
+        "properties": {
+            "Title": {
+                "id": "title",
+                "type": "title",
+                "title": [{"text": {"content": title}}],
+            },
+            "ArXiv ID": {
+                "id": "eprint",
+                "type": "rich_text",
+                "rich_text": [{"text": {"content": eprint}}],
+            },
+            "URL": {
+                "id": "url",
+                "type": "url",
+                "url": f"https://inspirehep.net/literature/{inspire_id}",
+            },
+        },
+    }
+
+
+class FakeNotion:
+    iter_database = Notion.iter_database
+    iter_database_batches = Notion.iter_database_batches
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.bodies = []
+
+    def query_database(self, id, start_cursor, page_size, filter=None, sorts=None):
+        self.bodies.append({"filter": filter, "sorts": sorts})
+
+        # Like Notion, archived pages are never returned
+        pages = [page for page in self.pages if not page["archived"]]
+        pages = sorted(pages, key=lambda page: page["last_edited_time"])
+        if filter is not None:
+            after = filter["last_edited_time"]["on_or_after"]
+            pages = [page for page in pages if page["last_edited_time"] >= after]
+
+        start = int(start_cursor or 0)
+        end = start + page_size
+        return {
+            "results": pages[start:end],
+            "has_more": end < len(pages),
+            "next_cursor": str(end) if end < len(pages) else None,
+        }
+
+    def retrieve_page(self, id):
+        for page in self.pages:
+            if page["id"] == id:
+                return page
+
+        raise NotionError(
+            f"Could not find page with ID: {id}.", 404, "object_not_found"
+        )
+
+
+def test_mirror(tmp_path):
+    file = tmp_path / "mirror.db"
+    notion = FakeNotion(
+        [
+            make_page("page1", "Jet-images", "1511.05190", "1405106", "2024-11-01"),
+            make_page("page2", "Pileup", "1407.5675", "1307319", "2024-11-02"),
+        ]
+    )
+
+    # A missing mirror is never fresh
+    mirror = Mirror(file, PROPERTIES)
+    assert not mirror.is_fresh("database")
+
+    # The first sync fetches all pages
+    assert mirror.sync(notion, "database", page_size=1) == 2
+    assert notion.bodies[0]["filter"] is None
+    assert mirror.is_fresh("database")
+    assert not mirror.is_fresh("another_database")
+    assert mirror.last_edited_time == "2024-11-02"
+
+    # Look up pages by the indexes
+    assert mirror.find_by_title("Jet-images").id == "page1"
+    assert mirror.find_by_eprint("1407.5675").id == "page2"
+    assert mirror.find_by_inspire_id("1405106").id == "page1"
+    assert mirror.find_by_title("Unknown") is None
+
+    # Only the properties needed are kept
+    assert list(mirror.find_by_title("Jet-images").properties) == ["ArXiv ID", "URL"]
+
+    # The mirror is persisted
+    mirror = Mirror(file, PROPERTIES)
+    assert mirror.is_fresh("database")
+    assert mirror.find_by_eprint("1511.05190").id == "page1"
+
+    # Later syncs only fetch the pages edited since the high-water mark
+    notion.pages[0] = make_page(
+        "page1", "Jet-images -- deep learning", "1511.05190", "1405106", "2024-11-03"
+    )
+    notion.pages.append(
+        make_page("page3", "Top tagging", "1902.09914", "1722035", "2024-11-04")
+    )
+    assert mirror.sync(notion, "database") == 3
+    assert notion.bodies[-1]["filter"]["last_edited_time"] == {
+        "on_or_after": "2024-11-02"
+    }
+    assert mirror.find_by_title("Jet-images") is None
+    assert mirror.find_by_title("Jet-images -- deep learning").id == "page1"
+    assert len(mirror) == 3
+
+    # Archived pages are not seen by later syncs, but are dropped when checked
+    notion.pages[2] = make_page(
+        "page3", "Top tagging", "1902.09914", "1722035", "2024-11-05", True
+    )
+    assert mirror.sync(notion, "database") == 0
+    page = mirror.find_by_eprint("1902.09914")
+    assert page.id == "page3"
+    assert mirror.check(notion, page) is None
+    assert mirror.find_by_eprint("1902.09914") is None
+
+    page = mirror.find_by_eprint("1407.5675")
+    assert mirror.check(notion, page).id == "page2"
+
+    # Deleted pages are dropped too
+    mirror.upsert(Page.from_response(notion.pages[2] | {"archived": False}))
+    del notion.pages[2]
+    assert mirror.check(notion, mirror.find_by_eprint("1902.09914")) is None
+
+    # A full sync drops the pages it has not seen
+    mirror.upsert(Page.from_response(make_page("page4", "Gone", "1", "1", "2024")))
+    assert mirror.sync(notion, "database", full=True) == 2
+    assert sorted(page.id for page in mirror.iter_pages()) == ["page1", "page2"]
+
+    # An expired mirror is stale
+    mirror = Mirror(file, PROPERTIES, ttl=0)
+    assert not mirror.is_fresh("database")
+
+    # A full sync can be streamed, skipping archived pages
+    pages = mirror.iter_sync(notion, "database", page_size=1, full=True)
+    assert next(pages).id == "page2"
+    assert mirror.synced_at is None
+    assert [page.id for page in pages] == ["page1"]
+    assert mirror.synced_at is not None
+    assert len(Mirror(file, PROPERTIES)) == 2
+
+    # Pages updated while iterating over the mirror are not seen again
+    pages = []
+    for page in mirror.iter_pages(batch_size=1):
+        mirror.upsert(page, save=False)
+        pages.append(page.id)
+    assert pages == ["page2", "page1"]
+
+    # Changes are only kept once saved
+    mirror.remove("page1", save=False)
+    mirror.close()
+    assert Mirror(file, PROPERTIES).find_by_eprint("1511.05190").id == "page1"
@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+from hpm.pipeline import Pipeline
+
+
+def test_pipeline():
+    def double(batch):
+        return [i * 2 for i in batch]
+
+    def slow(i):
+        # Later items finish first
+        time.sleep(0.001 * (10 - i % 10))
+        return i + 1
+
+    pipeline = Pipeline(range(100), queue_size=10)
+    pipeline.add_stage("double", double, workers=2, batch_size=7)
+    pipeline.add_stage("slow", slow, workers=4)
+
+    assert list(pipeline) == [i * 2 + 1 for i in range(100)]
+    assert [(i.name, i.workers, i.items) for i in pipeline.stats()] == [
+        ("source", 1, 100),
+        ("double", 2, 100),
+        ("slow", 4, 100),
+    ]
+
+
+def test_pipeline_backpressure():
+    n_taken = 0
+
+    def source():
+        nonlocal n_taken
+        for i in range(1000):
+            n_taken += 1
+            yield i
+
+    n_threads = threading.active_count()
+    pipeline = Pipeline(source(), queue_size=5)
+    pipeline.add_stage("identity", lambda i: i, workers=2)
+
+    results = iter(pipeline)
+    assert next(results) == 0
+    time.sleep(0.2)
+
+    # The source is held back while the results are not consumed, with at most
+    # the queues and workers full, the first result out and the next item taken
+    assert n_taken <= 5 * 2 + 3 + 1 + 1
+    results.close()
+    assert threading.active_count() == n_threads
+
+
+def test_pipeline_error():
+    def source():
+        yield 1
+        raise ValueError("Failed to query the database")
+
+    pipeline = Pipeline(source())
+    pipeline.add_stage("identity", lambda i: i, batch_size=10)
+
+    # The items taken before the error still come out
+    results = []
+    with pytest.raises(ValueError, match="query the database"):
+        for i in pipeline:
+            results.append(i)
+    assert results == [1]
+
+    pipeline = Pipeline(range(3))
+    pipeline.add_stage("fail", lambda i: 1 / 0)
+
+    with pytest.raises(ZeroDivisionError):
+        list(pipeline)
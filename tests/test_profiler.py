@@ -0,0 +1,50 @@
+import json
+import time
+
+from typer.testing import CliRunner
+
+from hpm.cli import app
+from hpm.profiler import Profiler, phase
+from hpm.services.instrumentation import RequestEvent
+
+runner = CliRunner()
+
+
+def test_profiler(tmp_path):
+    profiler = Profiler()
+    profiler.start()
+    try:
+        with phase("sleep"):
+            time.sleep(0.02)
+
+        event = RequestEvent(
+            "notion", "GET", "/v1/pages/{id}", 200, time.perf_counter(), 2, 1, 0, 10, 1
+        )
+        profiler.record_request(event)
+    finally:
+        profiler.stop()
+
+    # Phases are no longer timed once stopped
+    with phase("ignored"):
+        pass
+
+    rows = {i["name"]: i for i in profiler.summary()}
+    assert list(rows) == ["GET /v1/pages/{id}", "sleep"]
+    assert rows["sleep"]["histogram"] == [0, 0, 1, 0, 0]
+    assert rows["GET /v1/pages/{id}"]["histogram"] == [0, 0, 0, 0, 1]
+    assert rows["GET /v1/pages/{id}"]["retries"] == 1
+
+    file = tmp_path / "trace.json"
+    profiler.write_trace(file)
+    events = json.loads(file.read_text())["traceEvents"]
+    assert [i["name"] for i in events] == ["sleep", "GET /v1/pages/{id}"]
+    assert events[0]["dur"] >= 20000
+
+
+def test_profile_option(tmp_path):
+    file = tmp_path / "trace.json"
+    result = runner.invoke(app, ["--profile-output", str(file), "info"])
+
+    assert result.exit_code == 0
+    assert "Profile of" in result.stdout
+    assert json.loads(file.read_text())["traceEvents"][0]["cat"] == "console"
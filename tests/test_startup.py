@@ -0,0 +1,31 @@
+import json
+import subprocess
+import sys
+
+# Modules only the commands that use them may import
+HEAVY_MODULES = [
+    "httpx",
+    "pydantic",
+    "pyfiglet",
+    "requests",
+    "tinydb",
+    "typeguard",
+    "yaml",
+    "hpm.journal",
+    "hpm.mirror",
+    "hpm.pipeline",
+    "hpm.schema",
+    "hpm.services.inspire_hep.client",
+    "hpm.services.notion.client",
+    "hpm.template",
+]
+
+
+def test_startup_imports():
+    code = "import json, sys, hpm.cli; print(json.dumps(list(sys.modules)))"
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    )
+    modules = set(json.loads(output.stdout))
+
+    assert [i for i in HEAVY_MODULES if i in modules] == []
@@ -0,0 +1,89 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from hpm.services.inspire_hep.objects import Author, Paper
+from hpm.services.notion.objects.page import Page
+from hpm.services.notion.objects.page_properties import MultiSelect, Number, Title
+from hpm.template import Template, TemplateError
+
+DATA = {
+    "database_id": "database",
+    "properties": {
+        "id": None,
+        "title": "Title",
+        "authors.name": "Authors",
+        "citation_count": "Citations",
+    },
+}
+PROPERTY_TYPES = {
+    "Title": "title",
+    "Authors": "multi_select",
+    "Citations": "number",
+    "Comments": "rich_text",
+}
+
+
+def make_paper(citation_count=1):
+    return Paper(
+        title="A paper",
+        authors=[Author(name="A"), Author(name="B")],
+        citation_count=citation_count,
+    )
+
+
+def test_template():
+    template = Template(DATA, PROPERTY_TYPES)
+
+    assert template.database_id == "database"
+    assert template.paper_properties == ["title", "authors.name", "citation_count"]
+    assert template.needs_bibtex is False
+    assert template.page_properties(make_paper()) == {
+        "Title": Title("A paper"),
+        "Authors": MultiSelect(["A", "B"]),
+        "Citations": Number(1),
+    }
+
+
+def test_template_unknown_paper_property():
+    for paper_property in ["journal", "authors.email"]:
+        data = {"database_id": "database", "properties": {paper_property: "Title"}}
+        with pytest.raises(TemplateError, match=paper_property):
+            Template(data)
+
+
+def test_template_bind():
+    template = Template(DATA)
+
+    with pytest.raises(TemplateError, match="Authors, Citations"):
+        template.bind({"Title": "title", "Citations": "formula"})
+
+    template.bind(PROPERTY_TYPES)
+    assert [i.page_property_cls for i in template.mappings] == [
+        Title,
+        MultiSelect,
+        Number,
+    ]
+
+
+def test_template_update():
+    template = Template(DATA, PROPERTY_TYPES)
+    properties = template.page_properties(make_paper(citation_count=1))
+    page = Page(id="page", properties=properties)
+
+    assert template.update(page, make_paper(citation_count=1)) == []
+    assert template.update(page, make_paper(citation_count=2)) == [("Citations", 1, 2)]
+    assert page.properties["Citations"].value == 2
+
+
+def test_template_bibtex():
+    transport = MagicMock()
+    transport.get.return_value.text = "@article{A, title={A paper}}\n"
+    data = {"database_id": "database", "properties": {"bibtex": "BibTeX"}}
+    template = Template(data, {"BibTeX": "rich_text"}, transport=transport)
+
+    # BibTeX is loaded with the transport of the command
+    paper = Paper(title="A paper", bibtex_link="https://inspirehep.net/bibtex")
+    properties = template.page_properties(paper)
+    assert properties["BibTeX"].value == "@article{A, title={A paper}}"
+    transport.get.assert_called_once_with("https://inspirehep.net/bibtex")